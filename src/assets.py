@@ -0,0 +1,57 @@
+# -------------------------------------------------------------
+# assets.py
+#
+# Background asset loading.
+# Assets are queued as (name, loader, arguments) and loaded one by one
+# on a daemon thread, so the title screen can be shown while sound
+# effects are decoded. Each asset's load time is recorded for the
+# startup report. Songs are not loaded here; they are streamed from
+# disk by pygame.mixer.music while they play.
+# -------------------------------------------------------------
+import threading
+import time
+
+class AssetLoader:
+    def __init__(self):
+        self.jobs = [] # (name, loader, args) in load order
+        self.assets = {}
+        self.load_times = {} # Seconds spent loading each asset
+        self.error = None
+        self.finished = threading.Event()
+        self.finish_time = None # perf_counter() value when loading ended
+        self.thread = None
+
+    def add(self, name, loader, *args):
+        """Queue an asset to be loaded by calling loader(*args)."""
+        self.jobs.append((name, loader, args))
+
+    def start(self):
+        """Start loading the queued assets on a background thread."""
+        self.thread = threading.Thread(target=self._load_all, name="asset-loader", daemon=True)
+        self.thread.start()
+
+    def _load_all(self):
+        try:
+            for name, loader, args in self.jobs:
+                start = time.perf_counter()
+                self.assets[name] = loader(*args)
+                self.load_times[name] = time.perf_counter() - start
+        except Exception as e: # Raised again on the main thread by wait()
+            self.error = e
+        finally:
+            self.finish_time = time.perf_counter()
+            self.finished.set()
+
+    def ready(self):
+        """Return True once every queued asset has been loaded (or loading failed)."""
+        return self.finished.is_set()
+
+    def wait(self):
+        """Block until loading is done and return the loaded assets by name."""
+        self.finished.wait()
+        if self.error is not None:
+            raise self.error
+        return self.assets
+
+    def __getitem__(self, name):
+        return self.wait()[name]
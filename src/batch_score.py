@@ -0,0 +1,159 @@
+# -------------------------------------------------------------
+# batch_score.py
+#
+# Re-scores recorded replays in parallel, e.g. after a chart or the
+# judgment windows in calculate_score changed.
+# Each (chart, replay) pair is played back headlessly (see replay.py)
+# by a pool of worker processes. Charts are compiled once up front, in
+# the parent, and every worker memory-maps the same .nrc file without
+# ever recompiling it, so the operating system
+# shares one copy of each chart between them; only file paths and small
+# result dicts cross process boundaries.
+#
+# Results are streamed as JSON lines, one per replay as it finishes,
+# followed by a summary line per chart with the score distribution
+# and judgment histogram.
+#
+#     python -m src.batch_score replays/ --output scores.jsonl
+#     python -m src.batch_score replays/*.nrr --chart charts/happy_birthday.chart
+# -------------------------------------------------------------
+import argparse
+import json
+import os
+import sys
+import time
+import warnings
+from collections import Counter
+from multiprocessing import Pool
+from src.constants import *
+from src.chart import load_chart
+from src.replay import read_replay, run_replay
+
+SCORE_BIN = 100 # Width of the score distribution bins
+
+def find_replays(paths):
+    """Expand directories into the .nrr files they contain, in name order."""
+    replays = []
+    for path in paths:
+        if os.path.isdir(path):
+            replays.extend(sorted(os.path.join(path, name) for name in os.listdir(path) if name.endswith(".nrr")))
+        else:
+            replays.append(path)
+    return replays
+
+def pair_charts(replays, chart_path=None):
+    """
+    Return the (chart, compiled, replay, recorded) tuples to score, where chart is
+    chart_path or the chart the replay was recorded on, compiled is that chart's
+    .nrc file, and recorded is True when the replay is scored on its own chart.
+    Each chart is compiled here, once, so the workers only ever memory-map it.
+    """
+    pairs = []
+    compiled = {}
+    for replay in replays:
+        chart = chart_path
+        try:
+            chart = chart_path or read_replay(replay)[0]["chart"].decode()
+            if chart not in compiled:
+                compiled[chart] = load_chart(chart).path
+        except (OSError, ValueError):
+            pass # The worker runs into the same error and reports it with the replay
+        pairs.append((chart, compiled.get(chart, chart), replay, chart_path is None))
+    return pairs
+
+def _init_worker():
+    """Run each worker without a window or sound device, and without repeated warnings."""
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+    os.environ["SDL_AUDIODRIVER"] = "dummy"
+    warnings.simplefilter("ignore")
+
+def score_pair(pair):
+    """Re-score one replay and return a JSON-ready result."""
+    chart, compiled, replay, recorded = pair
+    try:
+        result = run_replay(replay, compiled, check_count=recorded)
+    except (OSError, ValueError) as e:
+        return {"replay": replay, "chart": chart, "error": str(e)}
+    return {
+        "replay": replay,
+        "chart": chart,
+        "score": result["score"],
+        "recorded_score": sum(points for _, _, points in result["recorded"]),
+        "judgments": result["judgments"],
+        "matches": result["matches"],
+    }
+
+class ChartSummary:
+    """Running totals for the replays of one chart."""
+    def __init__(self):
+        self.replays = 0
+        self.changed = 0 # Replays whose judgments differ from the recording
+        self.scores = []
+        self.judgments = Counter()
+
+    def add(self, result):
+        self.replays += 1
+        self.changed += not result["matches"]
+        self.scores.append(result["score"])
+        self.judgments.update(result["judgments"])
+
+    def to_dict(self):
+        scores = np.array(self.scores)
+        bins = Counter((scores // SCORE_BIN * SCORE_BIN).tolist())
+        return {
+            "replays": self.replays,
+            "changed": self.changed,
+            "score_mean": float(scores.mean()),
+            "score_percentiles": dict(zip(("p10", "p50", "p90"), np.percentile(scores, (10, 50, 90)).tolist())),
+            "score_histogram": dict(sorted(bins.items())), # Bin start -> replays
+            "judgment_histogram": dict(self.judgments),
+        }
+
+def batch_score(pairs, output, processes=None, chunksize=4):
+    """
+    Score the pairs from pair_charts across a pool of `processes` workers (one per core by
+    default), writing each result to the `output` file as soon as it arrives, then a
+    summary per chart. Returns the summaries and the number of replays that failed.
+    """
+    summaries = {}
+    failed = 0
+    with open(output, "w") as f, Pool(processes, initializer=_init_worker) as pool:
+        # Results arrive in completion order; slow replays do not hold back the rest
+        for result in pool.imap_unordered(score_pair, pairs, chunksize):
+            f.write(json.dumps(result) + "\n")
+            f.flush()
+            if "error" in result:
+                failed += 1
+                continue
+            summaries.setdefault(result["chart"], ChartSummary()).add(result)
+
+        summaries = {chart: summary.to_dict() for chart, summary in summaries.items()}
+        for chart, summary in summaries.items():
+            f.write(json.dumps({"chart": chart, "summary": summary}) + "\n")
+    return summaries, failed
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-score recorded replays in parallel.")
+    parser.add_argument("replays", nargs="+", help="replay files (.nrr), or directories of them")
+    parser.add_argument("--chart", help="score every replay on this chart instead of the recorded ones")
+    parser.add_argument("--output", default="scores.jsonl", help="where to stream the results")
+    parser.add_argument("--processes", type=int, help="worker processes (default: one per core)")
+    parser.add_argument("--chunksize", type=int, default=4, help="replays handed to a worker at a time")
+    args = parser.parse_args()
+
+    pairs = pair_charts(find_replays(args.replays), args.chart)
+    start = time.perf_counter()
+    summaries, failed = batch_score(pairs, args.output, args.processes, args.chunksize)
+    elapsed = time.perf_counter() - start
+
+    for chart, summary in summaries.items():
+        print(f"{chart}: {summary['replays']} replays, mean score {summary['score_mean']:.1f}, "
+              f"{summary['changed']} with changed judgments")
+        print("  " + ", ".join(f"{judgment} {count}" for judgment, count in sorted(summary["judgment_histogram"].items())))
+    print(f"{len(pairs)} replays in {elapsed:.2f}s ({len(pairs) / elapsed:.1f} replays/s), results in {args.output}")
+    if failed:
+        print(f"{failed} replays could not be scored, see {args.output}")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,323 @@
+# -------------------------------------------------------------
+# benchmark.py
+#
+# Benchmark suite for the hot paths of the game loop: projection
+# (matrices and lookup table), note positions and updates, note
+# drawing (polygons against cached sprites), hit detection, scoring, spawning, a full frame
+# and seeking into the middle of the chart.
+# Every case runs headlessly against synthetic charts of several
+# sizes and records the time per frame (or per call) and the peak
+# memory allocated. Results are written as JSON and can be compared
+# against a saved baseline to catch regressions. The memory footprint
+# of one note (compiled record, NoteField slot and note view) is
+# measured for each chart size and checked against NOTE_MEMORY_BUDGET,
+# and the projection table's error against LUT_MAX_ERROR_PX.
+#
+#     python -m src.benchmark --output bench_results.json
+#     python -m src.benchmark --baseline bench_results.json
+# -------------------------------------------------------------
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+import pygame
+from src.constants import *
+from src.matrices import project_points, world_to_screen
+from src.projection_lut import ProjectionLUT, get_lut
+from src.scheduler import NoteScheduler
+from src.chart import load_chart
+from src.note_field import NoteField
+from src.game import GameManager
+
+DEFAULT_SIZES = (10, 1_000, 100_000)
+DT = 1 / 60
+
+def write_synthetic_chart(path, count, seed=0, notes_per_second=20):
+    """Write a .chart source with `count` random short and long notes."""
+    rng = np.random.default_rng(seed)
+    times = np.sort(rng.uniform(0, count / notes_per_second, count)) + TIME_AT_JUDGMENT
+    columns = rng.integers(1, 7, count)
+    is_long = rng.random(count) < 0.3
+    lengths = rng.uniform(0.2, 1.0, count)
+
+    with open(path, "w") as f:
+        f.write(f"title Synthetic {count}\n")
+        f.write("song sounds/happy_birthday.wav\n")
+        for t, col, long_note, length in zip(times, columns, is_long, lengths):
+            if long_note:
+                f.write(f"long {t:.4f} {t + length:.4f} {col}\n")
+            else:
+                f.write(f"short {t:.4f} {col}\n")
+    return path
+
+def time_case(fn, setup=None, min_time=0.2, max_repeats=200):
+    """
+    Run fn repeatedly (calling setup untimed before each run) and
+    return the median time of one run in milliseconds.
+    """
+    times = []
+    while len(times) < max_repeats and (len(times) < 3 or sum(times) < min_time):
+        if setup:
+            setup()
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+        if times[-1] > min_time: # Slow cases are only worth a single run
+            break
+    return statistics.median(times) * 1000
+
+def measure_memory(fn, setup=None):
+    """Return the peak memory in KiB allocated by one run of fn."""
+    if setup:
+        setup()
+    tracemalloc.start()
+    fn()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak / 1024
+
+def note_footprint(chart):
+    """
+    Return the bytes one note of `chart` costs, split into its compiled
+    record, its NoteField slot and its note view, with every note spawned at once.
+    """
+    count = max(len(chart), 1)
+    tracemalloc.start()
+    field = NoteField(capacity=0, sprites=False)
+    start, _ = tracemalloc.get_traced_memory() # Fixed cost of an empty field, not charged to notes
+    field._grow(len(chart))
+    grown, _ = tracemalloc.get_traced_memory()
+    views = [chart.make_note(i) for i in range(len(chart))]
+    after_views, _ = tracemalloc.get_traced_memory()
+    for note in views:
+        field.add(note)
+    end, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    footprint = {
+        "record": chart.notes.dtype.itemsize, # Memory-mapped, paged in from the .nrc file
+        "field_slot": (grown - start + end - after_views) / count,
+        "view": (after_views - grown) / count,
+    }
+    footprint["total"] = sum(footprint.values())
+    return footprint
+
+def over_budget(count, footprint):
+    """Return True if a chart of `count` notes costs more than NOTE_MEMORY_BUDGET per note."""
+    # Small charts are dominated by fixed costs (deque blocks, interned objects), so only large ones count
+    return count >= 10_000 and footprint["total"] > NOTE_MEMORY_BUDGET
+
+class FieldSnapshot:
+    """Saved copy of a NoteField so cases that move or hit notes can restart from the same state."""
+    def __init__(self, field):
+        self.field = field
+        self.arrays = {name: getattr(field, name).copy() for name in field._ARRAYS}
+        self.views = list(field.views)
+        self.free_slots = list(field.free_slots)
+        self.size = field.size
+        self.time = field.time
+        self.upcoming = {column: list(queue) for column, queue in field.columns.upcoming.items()}
+
+    def restore(self):
+        field = self.field
+        for name, array in self.arrays.items():
+            getattr(field, name)[:] = array
+        field.views[:] = self.views
+        field.free_slots[:] = self.free_slots
+        field.size = self.size
+        field.time = self.time
+        for i in np.flatnonzero(field.active[:field.size]):
+            field.views[i].index = i
+        for column, notes in self.upcoming.items():
+            field.columns.upcoming[column].clear()
+            field.columns.upcoming[column].extend(notes)
+            field.columns.held[column] = None
+
+def fill_field(game, rng):
+    """Spawn every note of the game's chart at once, spread along the highway."""
+    chart = game.chart
+    lengths = chart.notes["length"].astype(float)
+    tail_z = rng.uniform(JUDGMENT + lengths, START_Z + lengths)
+
+    # Spawn in arrival order so each column's queue stays ordered
+    order = np.argsort(tail_z - lengths, kind="stable")
+    for i in order:
+        note = chart.make_note(int(i))
+        # Time the note so that it is at tail_z now
+        note.spawn_time = game.elapsed_time - (START_Z - tail_z[i]) / Z_VELOCITY
+        game.notes.add(note)
+    game.notes.time = game.elapsed_time
+
+def run_cases(game, count, rng):
+    """Run every benchmark case against a game whose chart has `count` notes."""
+    field = game.notes
+    points = np.column_stack([
+        rng.uniform(-10, 10, count * 4), np.zeros(count * 4), rng.uniform(JUDGMENT - 2, START_Z, count * 4)
+    ])
+    offsets = rng.uniform(-2 / Z_VELOCITY, 2 / Z_VELOCITY, 10_000)
+    keys = list(COLUMN_KEYS)
+
+    fill_field(game, rng)
+    snapshot = FieldSnapshot(field)
+
+    def restart():
+        snapshot.restore()
+        game.elapsed_time = snapshot.time
+
+    def spawn_all():
+        scheduler = NoteScheduler.from_chart(game.chart)
+        t = 0
+        while len(scheduler):
+            t += DT
+            if scheduler.peek() <= t:
+                scheduler.release(t)
+
+    def frames_to_spawn():
+        last = float(game.chart.spawn_times[-1]) if len(game.chart) else 0
+        return max(1, int(last / DT) + 1)
+
+    def press_keys():
+        for key in keys * 10:
+            game.check_hit(key)
+            game.handle_key_release(key)
+
+    sprite_cache = field.sprites
+
+    def draw_notes(sprites):
+        def draw():
+            field.sprites = sprites
+            field.draw(game.screen)
+            field.sprites = sprite_cache
+        return draw
+
+    def warm_sprites():
+        """Fill the sprite cache untimed, so the case measures steady-state frames."""
+        if not sprite_cache.sprites:
+            draw_notes(sprite_cache)()
+
+    def full_frame():
+        game.update(DT)
+        game.draw()
+
+    middle = float(game.chart.spawn_times[len(game.chart) // 2]) if len(game.chart) else 0.0
+
+    # (name, function, setup, how many frames or calls one run covers, unit)
+    return [
+        ("project_points", lambda: project_points(points), None, 1, "frame"),
+        ("world_to_screen", lambda: [world_to_screen(p) for p in points[:count]], None, 1, "frame"),
+        ("ProjectionLUT.project", lambda: get_lut().project(points), None, 1, "frame"),
+        ("ProjectionLUT.build", ProjectionLUT, None, 1, "build"),
+        ("NoteField.vertices_3D", lambda: field.vertices_3D(field.active_slots(), snapshot.time + DT), restart, 1, "frame"),
+        ("NoteField.update", lambda: field.update(snapshot.time + DT), restart, 1, "frame"),
+        ("check_hit", press_keys, restart, len(keys) * 10, "key press"),
+        ("calculate_score", lambda: [game.calculate_score(offset) for offset in offsets], None, len(offsets), "call"),
+        ("schedule_spawn", spawn_all, None, frames_to_spawn(), "frame"),
+        ("draw_notes_polygons", draw_notes(None), None, 1, "frame"),
+        ("draw_notes_sprites", draw_notes(sprite_cache), warm_sprites, 1, "frame"),
+        ("full_frame", full_frame, restart, 1, "frame"),
+        ("seek", lambda: game.seek(middle), None, 1, "seek"), # Last, since it moves the scheduler
+    ]
+
+def run_benchmarks(sizes=DEFAULT_SIZES, seed=0, memory=True):
+    """Run the suite for each chart size and return the results as a dict."""
+    results = []
+    footprints = []
+    lut_error = get_lut().accuracy()
+    print(f"Projection table: {LUT_RESOLUTION} samples, max error {lut_error:.4f} px against project_points")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for count in sizes:
+            chart_path = write_synthetic_chart(os.path.join(tmp, f"synthetic_{count}.chart"), count, seed)
+            footprint = note_footprint(load_chart(chart_path)) # Also compiles outside of the timed cases
+            footprints.append({"notes": count, "bytes_per_note": footprint})
+            print(f"{'note_footprint':>22} {count:>7} notes: {footprint['total']:10.1f} B/note"
+                  f" (record {footprint['record']}, slot {footprint['field_slot']:.1f}, view {footprint['view']:.1f})"
+                  + (" OVER BUDGET" if over_budget(count, footprint) else ""))
+
+            for name, fn, setup, per_run, unit in run_cases(GameManager(chart_path, headless=True), count, np.random.default_rng(seed)):
+                result = {
+                    "name": name,
+                    "notes": count,
+                    "unit": unit,
+                    "time_ms": time_case(fn, setup) / per_run,
+                }
+                if memory:
+                    result["peak_memory_kb"] = measure_memory(fn, setup)
+                results.append(result)
+                print(f"{name:>22} {count:>7} notes: {result['time_ms']:10.4f} ms/{unit}"
+                      + (f" {result['peak_memory_kb']:10.1f} KiB" if memory else ""))
+
+    return {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pygame": pygame.version.ver,
+            "platform": platform.platform(),
+            "seed": seed,
+            "lut_max_error_px": lut_error,
+            "note_memory_budget": NOTE_MEMORY_BUDGET,
+        },
+        "footprints": footprints,
+        "results": results,
+    }
+
+def compare(results, baseline, threshold):
+    """
+    Print the change of every case against a baseline run.
+    Returns the cases that got slower by more than `threshold` (a fraction).
+    """
+    previous = {(r["name"], r["notes"]): r for r in baseline["results"]}
+    regressions = []
+    print(f"\n{'case':>22} {'notes':>7} {'baseline':>12} {'current':>12} {'change':>8}")
+    for result in results["results"]:
+        old = previous.get((result["name"], result["notes"]))
+        if old is None:
+            continue
+        change = result["time_ms"] / old["time_ms"] - 1 if old["time_ms"] else 0
+        flag = " REGRESSION" if change > threshold else ""
+        print(f"{result['name']:>22} {result['notes']:>7} {old['time_ms']:12.4f} {result['time_ms']:12.4f} {change:+8.1%}{flag}")
+        if flag:
+            regressions.append(result)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the Note Rush game loop.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="synthetic chart sizes to run")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the synthetic charts")
+    parser.add_argument("--output", default="bench_results.json", help="where to write the results")
+    parser.add_argument("--baseline", help="previous results file to compare against")
+    parser.add_argument("--threshold", type=float, default=0.10, help="slowdown that counts as a regression")
+    parser.add_argument("--no-memory", action="store_true", help="skip the peak memory measurements")
+    args = parser.parse_args()
+
+    results = run_benchmarks(args.sizes, args.seed, memory=not args.no_memory)
+    with open(args.output, "w") as f:
+        json.dump(results, f, indent=2)
+    print(f"\nResults written to {args.output}")
+
+    failed = False
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        failed |= bool(compare(results, baseline, args.threshold))
+
+    lut_error = results["meta"]["lut_max_error_px"]
+    if lut_error > LUT_MAX_ERROR_PX:
+        print(f"Projection table error {lut_error:.4f} px is over the {LUT_MAX_ERROR_PX} px tolerance")
+        failed = True
+
+    over = [f["notes"] for f in results["footprints"] if over_budget(f["notes"], f["bytes_per_note"])]
+    if over:
+        print(f"Note memory over the {NOTE_MEMORY_BUDGET} B/note budget for charts of {over} notes")
+        failed = True
+    if failed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# -------------------------------------------------------------
+# calibration.py
+#
+# Audio offset calibration.
+# A generated click track is played through pygame.mixer.music and
+# timed with the same SongClock the game uses. The player taps any
+# key on each click; the median distance from a tap to the nearest
+# click is how late the player hears (and reacts to) the audio.
+# The game subtracts this offset from its song clock, which shifts
+# both note spawning and judgments.
+# -------------------------------------------------------------
+import os
+import tempfile
+import time
+import wave
+import pygame
+from src.constants import *
+from src.song_clock import SongClock
+from src.text import TEXT_CACHE
+
+def write_click_track(path, bpm=CALIBRATION_BPM, beats=CALIBRATION_BEATS, frequency=44100):
+    """
+    Write a mono 16-bit WAV file with a short click on every beat.
+    Returns the song time of each click.
+    """
+    beat = 60 / bpm
+    samples = np.zeros(int((beats + 1) * beat * frequency), dtype=np.int16)
+    t = np.arange(int(0.03 * frequency)) / frequency
+    click = (np.sin(2 * np.pi * 1000 * t) * np.exp(-t * 150) * 20000).astype(np.int16)
+
+    click_times = [(i + 1) * beat for i in range(beats)]
+    for click_time in click_times:
+        start = int(click_time * frequency)
+        samples[start:start + len(click)] = click
+
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(frequency)
+        f.writeframes(samples.tobytes())
+    return click_times
+
+def measure_offset(taps, click_times, warmup=CALIBRATION_WARMUP):
+    """
+    Return the median time from each tap to its nearest click, ignoring taps
+    near the warmup clicks, or None if there were too few taps to tell.
+    """
+    click_times = np.asarray(click_times)
+    beat = click_times[1] - click_times[0]
+    offsets = []
+    for tap in taps:
+        i = np.argmin(np.abs(click_times - tap))
+        if i >= warmup and abs(tap - click_times[i]) < beat / 2:
+            offsets.append(tap - click_times[i])
+    if len(offsets) < (len(click_times) - warmup) // 2:
+        return None
+    return float(np.median(offsets))
+
+def run_calibration(screen, latency=0.0):
+    """
+    Play the click track and collect the player's taps, drawing progress to the screen.
+    latency is the mixer's output latency, as used by the game's SongClock.
+    Returns the measured offset in seconds, or None if cancelled or inconclusive.
+    """
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "calibration.wav")
+        click_times = write_click_track(path)
+        pygame.mixer.music.load(path)
+        try:
+            taps = collect_taps(screen, click_times, latency)
+        finally:
+            pygame.mixer.music.stop()
+            pygame.mixer.music.unload() # Release the file before it is deleted
+
+    if taps is None:
+        return None
+    return measure_offset(taps, click_times)
+
+def collect_taps(screen, click_times, latency):
+    """Play the loaded click track and return the song time of every tap, or None if cancelled."""
+    pygame.mixer.music.play()
+    clock = SongClock(latency=latency)
+    clock.start()
+
+    taps = []
+    end = click_times[-1] + 60 / CALIBRATION_BPM
+    while clock.time() < end:
+        clock.sync()
+        for e in pygame.event.get():
+            if e.type == pygame.QUIT or (e.type == pygame.KEYDOWN and e.key == pygame.K_ESCAPE):
+                return None
+            if e.type == pygame.KEYDOWN:
+                taps.append(clock.time())
+
+        screen.fill((0, 0, 0))
+        lines = ["CALIBRATION", "Tap any key on every click", f"Taps: {len(taps)}"]
+        offset = measure_offset(taps, click_times)
+        if offset is not None:
+            lines.append(f"Offset: {offset * 1000:+.0f} ms")
+        for i, line in enumerate(lines):
+            surface = TEXT_CACHE.render(line, (255, 255, 255), 36)
+            screen.blit(surface, surface.get_rect(center=(SCREEN_WIDTH // 2, SCREEN_HEIGHT // 3 + i * 50)))
+        pygame.display.flip()
+        time.sleep(INPUT_POLL_INTERVAL)
+
+    return taps
@@ -0,0 +1,237 @@
+# -------------------------------------------------------------------
+# chart.py
+#
+# Chart files: a text source format and a compiled binary form.
+#
+# Source format (.chart) - one entry per line, '#' starts a comment:
+#
+#     title Happy Birthday
+#     song sounds/happy_birthday.wav
+#     short <time> <column>
+#     long <start time> <end time> <column>
+#
+# Times are in seconds from the start of the song. For short notes the
+# time is when the top of the note reaches the judgment line; for long
+# notes the start and end are when the bottom and top reach it.
+#
+# Compiled format (.nrc) - little-endian, fixed width:
+#
+#     header  HEADER_DTYPE (224 bytes): magic, version, note count, the
+#             note physics it was compiled with, title and song path
+#     notes   RECORD_DTYPE (32 bytes each), sorted by spawn time
+#
+# Spawn times, arrival times and long-note lengths are precomputed at
+# compile time. The loader memory-maps the note records, and notes are
+# only turned into objects when the scheduler releases them.
+# -------------------------------------------------------------------
+import argparse
+import os
+from src.constants import *
+from src.note_field import SHORT, LONG
+from src.notes import ShortNote, LongNote
+
+MAGIC = b"NOTERUSH"
+VERSION = 1
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("count", "<u4"),
+    ("z_velocity", "<f4"),
+    ("start_z", "<f4"),
+    ("judgment", "<f4"),
+    ("reserved", "<u4"),
+    ("title", "S64"),
+    ("song", "S128"),
+])
+
+RECORD_DTYPE = np.dtype([
+    ("spawn_time", "<f8"), # When the note appears at START_Z
+    ("head_time", "<f8"), # When the bottom of the note reaches the judgment line
+    ("tail_time", "<f8"), # When the top of the note reaches the judgment line
+    ("length", "<f4"),
+    ("column", "u1"),
+    ("kind", "u1"),
+    ("pad", "V2"),
+])
+
+def find_note_length(t_start, t_end):
+    """Calculate the visual length of a long note based on time."""
+    return Z_VELOCITY * (t_end - t_start)
+
+def _column(field):
+    """Parse a column number, which must be one of the columns that have a key."""
+    col = int(field)
+    if col not in COLUMN_KEYS.values():
+        raise ValueError(f"column {col} is not between {min(COLUMN_KEYS.values())} and {max(COLUMN_KEYS.values())}")
+    return col
+
+def parse_chart_source(path):
+    """
+    Read a .chart source file.
+
+    Returns:
+        (metadata, records): A dict with the title and song path, and a
+        sorted array of RECORD_DTYPE note records.
+    """
+    metadata = {"title": "", "song": ""}
+    rows = []
+    time_j = TIME_AT_JUDGMENT
+
+    with open(path) as f:
+        for line_number, line in enumerate(f, 1):
+            line = line.split("#", 1)[0].strip()
+            if not line:
+                continue
+            keyword, _, rest = line.partition(" ")
+            fields = rest.split()
+            try:
+                if keyword in ("title", "song"):
+                    metadata[keyword] = rest.strip()
+                elif keyword == "short":
+                    if len(fields) != 2:
+                        raise ValueError("expected 'short <time> <column>'")
+                    t, col = float(fields[0]), _column(fields[1])
+                    spawn_time = t - time_j
+                    rows.append((spawn_time, t - SHORT_NOTE_LENGTH / Z_VELOCITY, t,
+                                 SHORT_NOTE_LENGTH, col, SHORT))
+                elif keyword == "long":
+                    if len(fields) != 3:
+                        raise ValueError("expected 'long <start time> <end time> <column>'")
+                    t1, t2, col = float(fields[0]), float(fields[1]), _column(fields[2])
+                    if t2 <= t1:
+                        raise ValueError(f"long note ends at {t2}, not after its start at {t1}")
+                    length = find_note_length(t1, t2)
+                    spawn_time = t1 - time_j + (t2 - t1)
+                    rows.append((spawn_time, t1, t2, length, col, LONG))
+                else:
+                    raise ValueError(f"unknown keyword '{keyword}'")
+            except ValueError as e:
+                raise ValueError(f"{path}:{line_number}: {e}") from None
+
+    if not metadata["song"]:
+        raise ValueError(f"{path}: missing 'song' line")
+
+    records = np.zeros(len(rows), dtype=RECORD_DTYPE)
+    if rows:
+        names = ("spawn_time", "head_time", "tail_time", "length", "column", "kind")
+        for name, values in zip(names, zip(*rows)):
+            records[name] = values
+    records = records[np.argsort(records["spawn_time"], kind="stable")]
+
+    return metadata, records
+
+def _header_field(metadata, name):
+    """Encode a metadata string, raising ValueError if it does not fit its header field."""
+    data = metadata[name].encode()
+    size = HEADER_DTYPE[name].itemsize
+    if len(data) > size:
+        raise ValueError(f"{name} is {len(data)} bytes long, but at most {size} fit in a compiled chart")
+    return data
+
+def compile_chart(source_path, output_path=None):
+    """Compile a .chart source file to the binary .nrc format and return its path."""
+    if output_path is None:
+        output_path = os.path.splitext(source_path)[0] + ".nrc"
+
+    metadata, records = parse_chart_source(source_path)
+
+    header = np.zeros(1, dtype=HEADER_DTYPE)
+    header["magic"] = MAGIC
+    header["version"] = VERSION
+    header["count"] = len(records)
+    header["z_velocity"] = Z_VELOCITY
+    header["start_z"] = START_Z
+    header["judgment"] = JUDGMENT
+    header["title"] = _header_field(metadata, "title")
+    header["song"] = _header_field(metadata, "song")
+
+    # Write a new file and swap it in, so processes that have the old one
+    # memory-mapped keep reading it and nobody sees a half-written chart
+    temp_path = f"{output_path}.{os.getpid()}.tmp"
+    try:
+        with open(temp_path, "wb") as f:
+            f.write(header.tobytes())
+            f.write(records.tobytes())
+        os.replace(temp_path, output_path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    return output_path
+
+def read_header(path):
+    """Read and validate the header of a compiled chart."""
+    header = np.fromfile(path, dtype=HEADER_DTYPE, count=1)
+    if len(header) != 1 or header["magic"][0] != MAGIC:
+        raise ValueError(f"{path} is not a compiled chart")
+    if header["version"][0] != VERSION:
+        raise ValueError(f"{path} has unsupported chart version {header['version'][0]}")
+    return header[0]
+
+def _is_stale(compiled_path, source_path):
+    """Return True if a compiled chart is missing or out of date with its source."""
+    if not os.path.exists(compiled_path):
+        return True
+    if os.path.getmtime(compiled_path) < os.path.getmtime(source_path):
+        return True
+    try:
+        header = read_header(compiled_path)
+    except ValueError:
+        return True
+    # Recompile if the note physics changed since the last build
+    return not np.allclose(
+        (header["z_velocity"], header["start_z"], header["judgment"]),
+        (Z_VELOCITY, START_Z, JUDGMENT),
+    )
+
+class Chart:
+    def __init__(self, path):
+        """Memory-map a compiled .nrc chart."""
+        header = read_header(path)
+        self.path = path
+        self.title = header["title"].decode()
+        self.song = header["song"].decode()
+
+        count = int(header["count"])
+        if count:
+            self.notes = np.memmap(path, dtype=RECORD_DTYPE, mode="r",
+                                   offset=HEADER_DTYPE.itemsize, shape=(count,))
+        else:
+            self.notes = np.zeros(0, dtype=RECORD_DTYPE)
+        self.spawn_times = self.notes["spawn_time"]
+
+    def __len__(self):
+        return len(self.notes)
+
+    def make_note(self, i):
+        """Create the note object for record `i`."""
+        record = self.notes[i]
+        if record["kind"] == LONG:
+            return LongNote(int(record["column"]), float(record["length"]), float(record["spawn_time"]))
+        return ShortNote(int(record["column"]), float(record["spawn_time"]))
+
+def load_chart(path):
+    """
+    Load a chart from a .chart source or a compiled .nrc file.
+    Sources are compiled next to themselves first if needed.
+    """
+    if not path.endswith(".nrc"):
+        compiled_path = os.path.splitext(path)[0] + ".nrc"
+        if _is_stale(compiled_path, path):
+            compile_chart(path, compiled_path)
+        path = compiled_path
+    return Chart(path)
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile Note Rush chart files.")
+    parser.add_argument("sources", nargs="+", help=".chart source files to compile")
+    args = parser.parse_args()
+
+    for source in args.sources:
+        output = compile_chart(source)
+        print(f"{source} -> {output} ({len(Chart(output))} notes)")
+
+if __name__ == "__main__":
+    main()
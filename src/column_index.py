@@ -0,0 +1,65 @@
+# -------------------------------------------------------------------
+# column_index.py
+#
+# Per-column lookup of the notes a key press or release can act on.
+# Each column keeps a deque of its upcoming notes ordered by arrival
+# at the judgment line, plus a slot for the long note currently held.
+# Key down/up only look at the front of one column instead of
+# scanning every note on screen.
+# -------------------------------------------------------------------
+from collections import deque
+from src.constants import *
+
+class ColumnIndex:
+    def __init__(self):
+        columns = sorted(COLUMN_KEYS.values())
+        self.upcoming = {column: deque() for column in columns}
+        self.held = {column: None for column in columns}
+
+    def add(self, note):
+        """Queue a newly spawned note behind the notes that arrive before it."""
+        queue = self.upcoming[note.column]
+        head_time = note.head_time
+
+        # Notes almost always spawn in arrival order, so this is an append
+        i = len(queue)
+        while i > 0 and queue[i - 1].index >= 0 and queue[i - 1].head_time > head_time:
+            i -= 1
+        queue.insert(i, note)
+
+    def discard(self, note):
+        """Forget a note that left the field."""
+        if self.held[note.column] is note:
+            self.held[note.column] = None
+
+        # Notes leave in arrival order, so they are usually at the front.
+        # Anything else is dropped lazily once it reaches the front.
+        queue = self.upcoming[note.column]
+        if queue and queue[0] is note:
+            queue.popleft()
+
+    def _is_waiting(self, note):
+        """Return True if a note can still be struck by a key press."""
+        return note.index >= 0 and not note.hit and note.hold_state == APPROACHING
+
+    def candidates(self, column):
+        """Yield the notes in a column that are still waiting to be hit, closest first."""
+        queue = self.upcoming[column]
+        while queue and not self._is_waiting(queue[0]):
+            queue.popleft()
+
+        for note in queue:
+            if self._is_waiting(note):
+                yield note
+
+    def start_hold(self, note):
+        """Move a long note from its column's queue into the held slot."""
+        self.held[note.column] = note
+
+    def release_hold(self, column):
+        """Clear and return the long note held in a column, if any."""
+        note = self.held[column]
+        self.held[column] = None
+        if note is not None and note.index >= 0 and note.hold_state == HELD:
+            return note
+        return None
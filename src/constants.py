@@ -7,8 +7,17 @@
 # - Screen dimensions
 # - Line and judgment zone settings
 # - Perspective projection settings (FOV, near/far planes)
+# - Camera settings (pitch, height)
 # - Note physics (velocity, spawn depth)
+# - Projection lookup table resolution and depth range
+# - Note sprite cache size
+# - Per-note memory budget
+# - Simulation, render and input polling rates
+# - Audio clock and calibration settings
+# - Judgment window sizes, in Z distance and in seconds
+# - Hold note states
 # - Key mappings for input handling
+# - Default chart file, settings file and replay directory
 # - TIME_AT_JUDGMENT: precomputed time it takes for a note to reach the judgment line
 
 # Used by multiple components such as note spawning, movement logic, and rendering.
@@ -31,9 +40,66 @@ FOV = np.radians(60)
 NEAR_PLANE = 0.1
 FAR_PLANE = 1
 
+# Camera Settings
+CAMERA_PITCH = 20 # Degrees the camera is tilted down towards the highway
+CAMERA_HEIGHT = 13 # Height of the camera above the y = 0 playfield
+
 # Note Settings
 Z_VELOCITY = 20
 START_Z = 100
+SHORT_NOTE_LENGTH = 1.5
+
+# Projection lookup table (see projection_lut.py)
+LUT_RESOLUTION = 1024 # Depth samples, about 0.02 px worst-case error
+LUT_NEAR_Z = 10 # Depth range covered by the table
+LUT_FAR_Z = 300
+LUT_MAX_ERROR_PX = 0.1 # Largest error against project_points the benchmark accepts
+
+# Note sprite cache (see sprites.py)
+SPRITE_Y_STEP = 1 # Pixels of screen depth per sprite bucket
+SPRITE_CACHE_BYTES = 8 * 1024 * 1024
+SPRITE_COLORKEY = (255, 0, 255) # Transparent color of note sprites; no note uses it
+SPRITE_MIN_NOTES = 16 # Short notes on screen below which polygons are cheaper than sprites
+
+# Memory budget (see benchmark.py)
+NOTE_MEMORY_BUDGET = 256 # Bytes per note with every note spawned: chart record, field slot and view
+
+# Timing Settings
+SIM_HZ = 240 # Fixed rate of the gameplay simulation
+SIM_DT = 1 / SIM_HZ
+RENDER_FPS = 60 # Render frame cap, 0 for uncapped
+MAX_FRAME_TIME = 0.25 # Longest frame the simulation will catch up on
+INPUT_POLL_INTERVAL = 0.001 # Seconds between input polls while waiting for the next frame
+
+# Audio Settings
+AUDIO_FREQUENCY = 44100
+AUDIO_BUFFER_SIZE = 256 # Samples per mixer buffer; smaller means lower latency but more risk of crackling
+VOICES_PER_COLUMN = 2 # Mixer channels reserved for each column's hit sounds
+SHARED_CHANNELS = 4 # Mixer channels for other sound effects
+CLOCK_SMOOTHING = 0.1 # Fraction of the song clock's drift corrected per playback position update
+MAX_CLOCK_DRIFT = 0.05 # Drift in seconds beyond which the song clock snaps to the audio
+
+# Calibration
+CALIBRATION_BPM = 100
+CALIBRATION_BEATS = 24
+CALIBRATION_WARMUP = 4 # Beats to ignore while the player finds the rhythm
+
+# Judgment Settings
+JUDGMENT_WINDOW = 1.8 # Max Z distance from the judgment line that can still be hit
+MISS_DISTANCE = 2 # Z distance past the judgment line at which a note is gone
+
+# The same windows in seconds from a note's arrival, used to judge on time offsets
+HIT_WINDOW = JUDGMENT_WINDOW / Z_VELOCITY
+PERFECT_WINDOW = 0.2 / Z_VELOCITY
+GREAT_WINDOW = 0.5 / Z_VELOCITY
+GOOD_WINDOW = 1.2 / Z_VELOCITY
+MISS_TIME = MISS_DISTANCE / Z_VELOCITY
+
+# Hold note states. Short notes stay APPROACHING until they are hit or gone.
+APPROACHING = 0 # Not held yet
+HELD = 1 # Key is down and the head is pinned to the judgment line
+RELEASED = 2 # Key was let go, or the tail passed while held
+MISSED = 3 # The head passed before the hold started
 
 # Keybinds
 COLUMN_KEYS = {
@@ -45,5 +111,17 @@ COLUMN_KEYS = {
     pygame.K_l: 1,
 }
 
+PROFILER_KEY = pygame.K_F3 # Toggles the frame profiler overlay
+
+# Charts
+DEFAULT_CHART = "charts/happy_birthday.chart"
+
+# Player settings
+SETTINGS_FILE = "settings.json"
+
+# Replays (see replay.py)
+REPLAY_DIR = "replays" # Every session is recorded here
+REPLAY_BUFFER_RECORDS = 256 # Records buffered in memory between writes
+
 TIME_AT_JUDGMENT = (START_Z - JUDGMENT)/(Z_VELOCITY) # Time notes hit judgment line based on distanced travelled and velocity
 
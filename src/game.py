@@ -4,257 +4,502 @@
 # Core game logic for the Guitar Hero-style rhythm game "Note Rush".
 # Handles initialization, input, rendering, scoring, and game loop.
 # -------------------------------------------------------------
+import os
 import pygame
 import sys
+import time
+from collections import Counter
 from src.constants import *
-from src.matrices import world_to_screen
-from src.notes import ShortNote, LongNote
-from src.shapes import draw_lines, draw_judgment, draw_column_labels, draw_title_screen
+from src.projection_lut import get_lut
+from src.notes import LongNote
+from src.chart import load_chart
+from src.note_field import NoteField
+from src.scheduler import NoteScheduler
+from src.practice import IntervalIndex
+from src.replay import ReplayWriter, SEEK
+from src.shapes import StaticLayer, draw_title_screen
 from src.key_handler import ColumnHighlighter
+from src.text import TEXT_CACHE, get_font
+from src.song_clock import SongClock
+from src.settings import load_settings, save_settings
+from src.calibration import run_calibration
+from src.assets import AssetLoader
+from src.sound_engine import SoundEngine, init_mixer
+from src.profiler import FrameProfiler, EVENTS, SPAWN, NOTES, DRAW, HIGHLIGHT, HUD, PRESENT
 
 class GameManager:
-    def __init__(self):
-        """Initialize the game, load assets, and set up game state."""
+    def __init__(self, chart_path=DEFAULT_CHART, dirty_rects=False, headless=False,
+                 show_profiler=False, trace_path=None, render_fps=RENDER_FPS, audio_offset=None,
+                 audio_buffer=AUDIO_BUFFER_SIZE, audio_frequency=AUDIO_FREQUENCY, practice=None, replay_path=None):
+        """
+        Initialize the game, load assets, and set up game state.
+        With dirty_rects, only the screen areas that changed are presented each frame.
+        With headless, the dummy video and audio drivers are used so no window or
+        sound device is needed (see simulate).
+        show_profiler starts with the frame profiler overlay on (toggle with F3), and
+        trace_path is where the profiler's trace is written when the game exits.
+        render_fps caps the render rate (0 for uncapped); the simulation always
+        steps at SIM_HZ.
+        audio_offset is the player's audio offset in seconds; by default the
+        calibrated one from the settings file is used (see calibrate).
+        audio_buffer is the mixer buffer size in samples, and audio_frequency
+        its sample rate in Hz.
+        practice is a PracticeSession to start part way into the song, loop a
+        section or change the playback rate.
+        replay_path is where the session's input and judgments are recorded, if anywhere.
+        """
+        self.init_time = time.perf_counter() # For the startup report
+        if headless:
+            os.environ["SDL_VIDEODRIVER"] = "dummy"
+            os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+        init_mixer(audio_frequency, audio_buffer)
         pygame.init()
         pygame.mixer.init()
+        self.sound = SoundEngine(audio_buffer) # Reserved per-column channels for hit sounds
+        self.input_stamp = None # perf_counter() value when the events being handled were polled
 
         # Screen Settings
         self.screen = pygame.display.set_mode((SCREEN_WIDTH, SCREEN_HEIGHT))
         pygame.display.set_caption("Note Rush")
 
         # Time
-        self.clock = pygame.time.Clock()
         self.running = True
-        self.elapsed_time = 0
+        self.elapsed_time = 0 # Song time of the last simulation step
+        if audio_offset is None:
+            audio_offset = load_settings()["audio_offset"]
+        self.practice = practice
+        rate = practice.rate if practice else 1.0
+        self.song_clock = SongClock(latency=self.sound.output_latency, offset=audio_offset, rate=rate) # Follows the song's playback position
+        self.render_fps = render_fps
 
         # Note States
-        self.notes = []
-        self.hittable_notes = []
+        self.notes = NoteField()
 
         # Highlighter
         self.highlighter = ColumnHighlighter() 
 
         # Game Text
-        self.font = pygame.font.SysFont(None, 36)
+        self.font = get_font(36)
+
+        # Rendering
+        self.playfield = StaticLayer(self.font) # Cached lanes, judgment bars and key boxes
+        self.dirty_rects = dirty_rects
+        self.full_redraw = True
+        self.previous_rects = [] # Areas drawn over the background last frame
+
+        # Profiling
+        self.profiler = FrameProfiler()
+        self.show_profiler = show_profiler
+        self.trace_path = trace_path
         self.score = 0
         self.judgment_messages = []
+        self.judgment_counts = Counter()
+        self.judgment_y = get_lut().y(JUDGMENT) # Y-Coord of judgment line
 
         # Add title screen state
         self.show_title_screen = True
 
-        # Load sounds
-        self.hit_sound = pygame.mixer.Sound("sounds/column_sound.wav")
-        self.hit_success_sound = pygame.mixer.Sound("sounds/hit_success.wav")
-        self.song_sound = pygame.mixer.Sound("sounds/happy_birthday.wav")
-
         # Load note schedule
-        self.scheduled_notes = self.load_song_notes()
-
-    @staticmethod
-    def find_note_length(t_start, t_end):
-        """Calculate the visual length of a long note based on time."""
-        return Z_VELOCITY * (t_end - t_start)
-
-    def calculate_score(self, z):
-        """Return judgment string and points based on note's Z-position accuracy."""
-        diff = abs(z - JUDGMENT)
-        if diff == 0:
+        self.chart_path = chart_path
+        self.chart = self.load_song_notes()
+        self.scheduler = NoteScheduler.from_chart(self.chart)
+        self.note_index = None # IntervalIndex over the chart, built on the first seek
+        self.replay_path = replay_path
+        self.replay = None # ReplayWriter once the song has started
+
+        # Load sounds in the background while the title screen is shown.
+        # The song itself is streamed by pygame.mixer.music once it starts.
+        self.assets = AssetLoader()
+        self.assets.add("hit_sound", pygame.mixer.Sound, "sounds/column_sound.wav")
+        self.assets.add("hit_success_sound", pygame.mixer.Sound, "sounds/hit_success.wav")
+        self.assets.start()
+        self.hit_sound = None
+        self.hit_success_sound = None
+        self.title_time = None # Seconds from startup to the first title screen frame
+        self.startup_reported = False
+
+    def calculate_score(self, offset):
+        """
+        Return judgment string and points based on timing accuracy, where offset is
+        how many seconds after the note reached the judgment line it was played.
+        """
+        diff = abs(offset)
+        if diff <= PERFECT_WINDOW:
             return "PERFECT!", 100
-        elif diff <= 0.5:
+        elif diff <= GREAT_WINDOW:
             return "GREAT!", 80
-        elif diff <= 1.2:
+        elif diff <= GOOD_WINDOW:
             return "GOOD", 50
-        elif diff <= 1.8:
+        elif diff <= HIT_WINDOW:
             return "OK", 20
         else:
             return "MISS", 0
 
     def load_song_notes(self):
-        """Load and return scheduled notes (short and long) for the song."""
-        time_j = TIME_AT_JUDGMENT
-
-        # Tuple array of timestamps and column
-        short_notes_data = [
-            (4.435, 5), (4.678, 5), (7.423, 5), (7.645, 5),
-            (10.445, 5), (10.662, 5), (12.001, 4), (12.222, 4),
-            (13.453, 2), (13.732, 2),
-        ]
-
-        # Tuple array of timestamps (start time, end time) and column
-        long_notes_data = [
-            (4.903, 5.420, 4), (5.420, 5.845, 3), (5.845, 6.406, 2),
-            (6.406, 7.162, 3), (7.914, 8.446, 4), (8.446, 8.995, 3),
-            (8.995, 9.454, 2), (9.454, 10.230, 1), (11.007, 11.457, 2),
-            (11.457, 11.937, 3), (12.432, 12.989, 2), (12.989, 13.331, 3),
-            (13.956, 14.405, 1), (14.405, 14.935, 2), (14.935, 15.433, 3),
-            (14.935, 15.433, 5), (15.433, 19, 2), (15.433, 19, 4),
-        ]
-
-        # Tuple array of spawn time and type of note
-        scheduled = []
-        for t, col in short_notes_data:
-            spawn_time = t - time_j
-            scheduled.append((spawn_time, ShortNote(col)))
-        for t1, t2, col in long_notes_data:
-            length = self.find_note_length(t1, t2)
-            spawn_time = t1 - time_j + (t2 - t1)
-            scheduled.append((spawn_time, LongNote(col, length)))
-
-        return scheduled
-
-    def check_hit(self, key):
-        """Handle key press events and determine if a note was successfully hit."""
+        """Load the song's chart; its notes are created lazily as they are scheduled."""
+        return load_chart(self.chart_path)
+
+    def check_hit(self, key, now=None):
+        """
+        Handle key press events and determine if a note was successfully hit.
+        now is the song time of the press, the last simulation step by default.
+        """
         if key not in COLUMN_KEYS:
             return
+        if now is None:
+            now = self.elapsed_time
         col = COLUMN_KEYS[key]
-        for note in self.hittable_notes:
-            if isinstance(note, LongNote) and note.column == col: # Handle LongNote functionality
-                if note.is_bottom_in_judgment_zone() and not note.being_held:
-                    note.being_held = True
-                    note.hold_started = True
-                    return
-            elif not note.hit and note.column == col: # Handle ShortNote functionality
-                z = note.object.get_testing_z()
-                if JUDGMENT - 1.8 <= z <= JUDGMENT + 1.8: # Judgment zone
-                    note.hit = True
-                    judgment, pts = self.calculate_score(z)
-                    self.score += pts
-                    self.judgment_messages.append((judgment, self.elapsed_time))
-                    return
-
-    def handle_key_release(self, key):
-        """Handle key release events for ending long note holds and scoring."""
+        for note in self.notes.columns.candidates(col): # Closest waiting notes in this column
+            offset = now - note.head_time
+            if offset < -HIT_WINDOW: # Every later note arrives later still
+                return
+            if offset > HIT_WINDOW: # Already past the judgment zone
+                continue
+            if isinstance(note, LongNote): # Handle LongNote functionality
+                note.hold_state = HELD
+                self.notes.columns.start_hold(note)
+            else: # Handle ShortNote functionality
+                note.hit = True
+                self.record_judgment(*self.calculate_score(offset))
+            return
+
+    def handle_key_release(self, key, now=None):
+        """
+        Handle key release events for ending long note holds and scoring.
+        Only a note in the HELD state can be released; the release scores
+        if it lands within the judgment window of the note's tail.
+        now is the song time of the release, the last simulation step by default.
+        """
         if key not in COLUMN_KEYS:
             return
-        col = COLUMN_KEYS[key]
-        for note in self.notes:
-            if isinstance(note, LongNote) and note.column == col and note.being_held:
-                if note.is_top_in_judgment_zone():
-                    note.hold_completed = True
-                    note.hit = True
-                    z = note.object.vertices_3D[0][2]
-                    judgment, pts = self.calculate_score(z)
-                    self.score += pts
-                    self.judgment_messages.append((judgment, self.elapsed_time))
-                else:
-                    note.hit = True
-                note.being_held = False
-                return
-                
+        if now is None:
+            now = self.elapsed_time
+        note = self.notes.columns.release_hold(COLUMN_KEYS[key]) # The column's HELD note, if any
+        if note is None:
+            return
+        note.hold_state = RELEASED
+        note.hit = True
+        if note.is_top_in_judgment_zone(now):
+            self.record_judgment(*self.calculate_score(now - note.tail_time))
+
+    def present(self, rects):
+        """
+        Show the frame. In dirty rectangle mode only the areas drawn this frame
+        and last frame are pushed to the display.
+        """
+        if self.dirty_rects and not self.full_redraw:
+            pygame.display.update(self.previous_rects + rects)
+        else:
+            pygame.display.flip()
+        self.previous_rects = rects
+        self.full_redraw = False
+
+    def record_judgment(self, judgment, pts=0):
+        """Add a judgment to the score, the on-screen messages and the tallies."""
+        self.score += pts
+        self.judgment_messages.append((judgment, self.elapsed_time))
+        self.judgment_counts[judgment] += 1
+        if self.replay:
+            self.replay.judgment(judgment, pts, self.elapsed_time)
+
+    def start_song(self, timestep=SIM_DT):
+        """
+        Leave the title screen and start the song from the beginning, or from the practice start.
+        timestep is the simulation step, stored in the replay.
+        """
+        self.show_title_screen = False
+        self.full_redraw = True
+        assets = self.assets.wait()
+        self.hit_sound = assets["hit_sound"]
+        self.hit_success_sound = assets["hit_success_sound"]
+        pygame.mixer.music.load(self.chart.song) # Streamed from disk through mixer.music, which the song clock follows
+        if self.replay_path:
+            self.replay = ReplayWriter(self.replay_path, self.chart_path, len(self.chart), timestep)
+        if self.practice:
+            self.play_from(self.practice.start)
+            return
+        pygame.mixer.music.play()
+        self.song_clock.start()
+        self.elapsed_time = 0
 
-    def run(self):
-        """Main game loop: process events, update state, render visuals."""
-        judgment_y = world_to_screen((0, 0, JUDGMENT))[1] # Y-Coord of judgment line
+    def seek(self, t):
+        """
+        Jump to song time t. Only the notes on the field at t are created, and
+        notes whose head can no longer be hit are left out so the jump counts no misses.
+        """
+        if self.replay:
+            self.replay.write(SEEK, t, self.elapsed_time)
+        if self.note_index is None:
+            self.note_index = IntervalIndex.from_chart(self.chart)
+        overlapping, next_note = self.note_index.query(t)
+
+        self.notes.clear()
+        for i in overlapping:
+            note = self.chart.make_note(int(i))
+            if note.head_time + HIT_WINDOW >= t:
+                self.notes.add(note)
+        self.notes.update(t)
+        self.scheduler.cursor = next_note # The notes after t spawn as usual
+
+        self.elapsed_time = t
+        self.judgment_messages = []
+
+    def play_from(self, t):
+        """Seek to song time t and play the song, and run the song clock, from there."""
+        self.seek(t)
+        pygame.mixer.music.stop()
+        if self.song_clock.rate == 1: # mixer.music cannot change speed, so other rates are played silently
+            try:
+                pygame.mixer.music.play(start=t)
+            except pygame.error: # Past the end of the song, or a format that cannot seek
+                pass
+        self.song_clock.start(t)
+        self.full_redraw = True
+
+    def check_loop(self):
+        """Jump back to the start of the practice loop once the song reaches its end. Returns True after a jump."""
+        if not (self.practice and self.practice.loop_due(self.elapsed_time)):
+            return False
+        self.practice.loops += 1
+        self.play_from(self.practice.start)
+        return True
+
+    def song_time(self):
+        """Return the current song time, as heard by the player."""
+        return self.song_clock.time()
+
+    def calibrate(self):
+        """
+        Measure the player's audio offset with a click track, then save it and
+        apply it to the song clock. Returns the offset, or None if calibration
+        was cancelled or inconclusive.
+        """
+        offset = run_calibration(self.screen, self.song_clock.latency)
+        if offset is not None:
+            self.song_clock.offset = offset
+            settings = load_settings()
+            settings["audio_offset"] = offset
+            save_settings(settings)
+        self.full_redraw = True
+        return offset
+
+    def poll_input(self):
+        """
+        Handle every pending input event, timestamped with the song time it was polled at.
+        Called between simulation steps and while waiting for the next frame, so the
+        timestamps do not depend on how long the last frame took to render.
+        """
+        events = pygame.event.get()
+        if events:
+            self.input_stamp = time.perf_counter()
+            now = self.song_time()
+            for e in events:
+                on_title = self.show_title_screen
+                self.handle_event(e, now)
+                if on_title and not self.show_title_screen: # This event started the song, and its clock
+                    now = self.song_time()
+
+    def handle_event(self, e, now=None):
+        """
+        Process one input event: quitting the game, key presses/releases, and starting the game from the title screen.
+        now is the song time the event happened at, the last simulation step by default.
+        """
+        if e.type == pygame.QUIT:
+            self.running = False
+        elif e.type == pygame.KEYDOWN and e.key == PROFILER_KEY: # Toggle the profiler overlay
+            self.show_profiler = not self.show_profiler
+            self.full_redraw = True
+        elif e.type == pygame.KEYDOWN:
+            if self.show_title_screen: # Any key pressed on title screen starts the game, once loaded
+                if self.assets.ready():
+                    self.start_song()
+            else: # Hit functionality
+                if self.replay:
+                    self.replay.key(True, e.key, self.elapsed_time if now is None else now, self.elapsed_time)
+                self.highlighter.press_key(e.key)
+                self.check_hit(e.key, now)
+                self.sound.play(self.hit_sound, COLUMN_KEYS.get(e.key), self.input_stamp)
+        elif e.type == pygame.KEYUP and not self.show_title_screen: # Release functionality
+            if self.replay:
+                self.replay.key(False, e.key, self.elapsed_time if now is None else now, self.elapsed_time)
+            self.highlighter.release_key(e.key)
+            self.handle_key_release(e.key, now)
+
+    def update(self, dt):
+        """Advance the simulation by one step of dt seconds: spawn, miss and classify notes."""
+        self.elapsed_time += dt
+
+        if self.scheduler.peek() <= self.elapsed_time: # Spawn notes that are due
+            for n in self.scheduler.release(self.elapsed_time):
+                self.notes.add(n)
+        self.profiler.mark(SPAWN)
+
+        # Remove missed or finished notes in bulk
+        for note in self.notes.update(self.elapsed_time):
+            self.record_judgment("MISS")
+
+        # Judgment messages
+        self.judgment_messages = [
+            (msg, t) for (msg, t) in self.judgment_messages if self.elapsed_time - t < 1.0
+        ]
+        self.profiler.mark(NOTES)
+
+    def draw(self, render_time=None):
+        """
+        Render the gameplay screen and present it. Notes are drawn where they are
+        at song time render_time, which defaults to the last simulation step.
+        """
+        if self.dirty_rects and not self.full_redraw: # Only restore what was drawn last frame
+            self.playfield.draw_background(self.screen, self.previous_rects)
+        else:
+            self.playfield.draw_background(self.screen)
+
+        rects = self.notes.draw(self.screen, render_time) # Draw notes onto the screen
+
+        # Column settings
+        self.playfield.draw_judgment(self.screen)
+        self.profiler.mark(DRAW)
+        rects.extend(self.highlighter.draw(self.screen))
+        self.profiler.mark(HIGHLIGHT)
+        self.playfield.draw_column_labels(self.screen)
+
+        # Render score
+        rects.append(TEXT_CACHE.draw_number(self.screen, "SCORE: ", self.score, (20, 20), (255, 255, 255), 36))
+
+        if self.judgment_messages: # Render most recent judgment message
+            msg, t = self.judgment_messages[-1]
+            color = (255, 255, 255)
+            surface = TEXT_CACHE.render(msg, color, 36)
+            rect = surface.get_rect(center=(SCREEN_WIDTH // 2, self.judgment_y - 100))
+            rects.append(self.screen.blit(surface, rect))
+
+        if self.show_profiler:
+            rects.append(self.profiler.draw_overlay(self.screen))
+        self.profiler.mark(HUD)
+
+        self.present(rects)
+        self.profiler.mark(PRESENT)
+
+    def is_song_finished(self):
+        """Return True once every note has spawned and left the field."""
+        return len(self.scheduler) == 0 and len(self.notes) == 0
+
+    def startup_report(self):
+        """Return a summary of startup times in milliseconds, or None while assets are loading."""
+        if not self.assets.ready():
+            return None
+        report = f"Startup: assets ready after {(self.assets.finish_time - self.init_time) * 1000:.0f} ms"
+        if self.title_time is not None:
+            report += f", title screen after {self.title_time * 1000:.0f} ms"
+        loads = ", ".join(f"{name} {seconds * 1000:.1f} ms" for name, seconds in self.assets.load_times.items())
+        return f"{report} ({loads})"
+
+    def wait_for_frame(self, deadline):
+        """
+        Keep polling input until perf_counter() reaches deadline, then return
+        the deadline of the frame after it. Without a render cap, returns at once.
+        """
+        if not self.render_fps:
+            return time.perf_counter()
+        while (remaining := deadline - time.perf_counter()) > 0:
+            self.poll_input()
+            time.sleep(min(remaining, INPUT_POLL_INTERVAL))
+        return max(deadline + 1 / self.render_fps, time.perf_counter())
 
+    def run(self):
+        """
+        Main game loop: process events, update state, render visuals.
+        The simulation runs in fixed SIM_DT steps to catch up with the song
+        clock (which follows the audio playback position), polling input before each step, then notes are rendered at the
+        exact song time. Input is also polled while waiting for the next frame.
+        """
+        deadline = time.perf_counter()
         while self.running:
-            dt = self.clock.tick(60) / 1000
-            
-            # Processes all input events: quitting the game, key presses/releases, and starting the game from the title screen.
-            for e in pygame.event.get():
-                if e.type == pygame.QUIT:
-                    self.running = False
-                elif e.type == pygame.KEYDOWN:
-                    if self.show_title_screen: # Implement initial game states
-                        self.show_title_screen = False # Any key pressed on title screen starts the game
-                        self.song_sound.play()  
-                        self.elapsed_time = 0 
-                    else: # Hit functionality
-                        self.highlighter.press_key(e.key) 
-                        self.check_hit(e.key)
-                        self.hit_sound.play()
-                elif e.type == pygame.KEYUP and not self.show_title_screen: # Release functionality
-                    self.highlighter.release_key(e.key)
-                    self.handle_key_release(e.key)
-            
-            if self.show_title_screen: 
-                draw_title_screen(self.screen)
+            deadline = self.wait_for_frame(deadline)
+            self.profiler.begin_frame()
+
+            self.poll_input()
+            self.profiler.mark(EVENTS)
+
+            if self.show_title_screen:
+                draw_title_screen(self.screen, loading=not self.assets.ready())
+                self.profiler.mark(DRAW)
+                pygame.display.flip()
+                self.profiler.mark(PRESENT)
+                if self.title_time is None:
+                    self.title_time = time.perf_counter() - self.init_time
             else:
-                self.elapsed_time += dt
-                
-                self.notes.extend([n for t, n in self.scheduled_notes if t <= self.elapsed_time]) # Spawn notes
-                self.scheduled_notes = [(t, n) for (t, n) in self.scheduled_notes if t > self.elapsed_time] # Keep only the notes that are waiting to appear
-
-                # Other states
-                self.screen.fill((0, 0, 0))
-                draw_lines(self.screen)
-
-                # Prepares lists to track hittable notes and those that need to be removed after being missed or hit
-                self.hittable_notes.clear()
-                notes_to_remove = []
-
-                # Iterates through all notes, updates their position, checks for misses, and renders them
-                for note in self.notes:
-                    if note.hit and not isinstance(note, LongNote):
-                        notes_to_remove.append(note)
-                        continue
-                    if isinstance(note, LongNote) and note.hit:
-                        notes_to_remove.append(note)
-                        continue
-
-                    note.update(dt)
-
-                    # Special handling for long notes
-                    if isinstance(note, LongNote):
-                        bottom_z = note.object.vertices_3D[2][2]
-                        top_z = note.object.vertices_3D[0][2]
-
-                        if bottom_z < JUDGMENT - 2 and not note.hold_started:
-                            self.judgment_messages.append(("MISS", self.elapsed_time))
-                            note.hit = True
-                            notes_to_remove.append(note)
-                            continue
-                        elif top_z < JUDGMENT - 2:
-                            if not note.hold_completed:
-                                note.hit = True
-                            notes_to_remove.append(note)
-                            continue
-                    else: # Remove if gone past the judgment zone
-                        z = note.object.get_testing_z()
-                        if z < JUDGMENT - 2:
-                            notes_to_remove.append(note)
-                            continue
-
-                    note.draw(self.screen) # Draw note onto the screen
-
-                    # Update hittable_notes
-                    if isinstance(note, LongNote):
-                        if note.is_bottom_in_judgment_zone() or note.is_top_in_judgment_zone():
-                            self.hittable_notes.append(note)
-                    else:
-                        z = note.object.get_testing_z()
-                        if JUDGMENT - 1.8 <= z <= JUDGMENT + 1.8:
-                            self.hittable_notes.append(note)
-
-                # Remove notes
-                for n in notes_to_remove:
-                    if n in self.notes:
-                        self.notes.remove(n)
-
-                # Column settings
-                draw_judgment(self.screen)
-                self.highlighter.draw(self.screen)
-                draw_column_labels(self.screen, self.font)
-
-                # Render score
-                self.screen.blit(
-                    self.font.render(f"SCORE: {self.score}", True, (255, 255, 255)), (20, 20)
-                )
-
-                # Judgment messages
-                self.judgment_messages = [
-                    (msg, t) for (msg, t) in self.judgment_messages if self.elapsed_time - t < 1.0
-                ]
-
-                if self.judgment_messages: # Render most recent judgment message
-                    msg, t = self.judgment_messages[-1]
-                    color = (255, 255, 255)
-                    surface = self.font.render(msg, True, color)
-                    rect = surface.get_rect(center=(SCREEN_WIDTH // 2, judgment_y - 100))
-                    self.screen.blit(surface, rect)
-
-            pygame.display.flip()
+                self.song_clock.sync()
+                # Catch up at most MAX_FRAME_TIME per frame; the rest is made up over the next frames
+                now = min(self.song_time(), self.elapsed_time + MAX_FRAME_TIME)
+                while self.elapsed_time + SIM_DT <= now:
+                    self.poll_input()
+                    self.profiler.mark(EVENTS)
+                    self.update(SIM_DT)
+                if self.check_loop():
+                    now = self.elapsed_time
+                self.draw(now)
+            self.profiler.end_frame(len(self.notes))
+
+            if not self.startup_reported and self.assets.ready():
+                print(self.startup_report())
+                self.startup_reported = True
 
         # Game exit
-        self.song_sound.stop()
+        if self.replay:
+            self.replay.close(self.elapsed_time)
+        print(self.sound.report())
+        if self.trace_path:
+            self.profiler.export_trace(self.trace_path)
+        pygame.mixer.music.stop()
         pygame.quit()
-        sys.exit()
\ No newline at end of file
+        sys.exit()
+
+    def simulate(self, input_source, timestep=SIM_DT, render=False):
+        """
+        Play the whole chart with a fixed timestep and scripted input, as fast as possible.
+
+        Args:
+            input_source: An object with a due(now) method that returns the
+                pygame events that happened at or before song time `now`,
+                each with a `time` attribute holding its song time.
+            timestep: Simulated seconds per step.
+            render: Also draw every frame (to the dummy display when headless).
+
+        Returns:
+            A dict with the score, judgment counts, frames simulated, song time
+            covered, simulated frames per second and the profiler summary of
+            the last frames.
+        """
+        self.start_song(timestep)
+        frames = 0
+        start = time.perf_counter()
+
+        while self.running and not self.is_song_finished():
+            self.profiler.begin_frame()
+            self.input_stamp = time.perf_counter()
+            for e in input_source.due(self.elapsed_time + timestep): # Events up to the end of this step
+                self.handle_event(e, e.time)
+            self.profiler.mark(EVENTS)
+            self.update(timestep)
+            self.check_loop()
+            if render:
+                self.draw()
+            self.profiler.end_frame(len(self.notes))
+            frames += 1
+
+        wall_time = time.perf_counter() - start
+        pygame.mixer.music.stop()
+        if self.replay:
+            self.replay.close(self.elapsed_time)
+
+        return {
+            "score": self.score,
+            "judgments": dict(self.judgment_counts),
+            "frames": frames,
+            "song_time": self.elapsed_time,
+            "wall_time": wall_time,
+            "fps": frames / wall_time if wall_time > 0 else float("inf"),
+            "profile": self.profiler.summary(),
+        }
@@ -4,15 +4,25 @@
 # Handles visual highlighting of columns when keys are pressed
 # in the Guitar Hero-style rhythm game. Highlights are shown as
 # semi-transparent rectangles over the active columns.
+# Each column's highlight is pre-rendered once onto a tightly bounded
+# surface and re-rendered only when the screen or camera changes.
 # -------------------------------------------------------------
 from src.constants import *
-from src.shapes import Quad
-from src.matrices import world_to_screen
+from src.shapes import column_x_edges
+from src.matrices import get_camera_version
+from src.projection_lut import get_lut
+from src.profiler import counters
+
+HIGHLIGHT_COLOR = (255, 255, 255, 60) # Alpha channel
 
 class ColumnHighlighter:
     def __init__(self):
         self.active_columns = set()
 
+        # Pre-rendered highlight for each column: column -> (surface, position)
+        self.overlays = {}
+        self.overlay_key = None
+
     def press_key(self, key):
         """Register a key press by adding its column to the active set."""
         if key in COLUMN_KEYS:
@@ -24,38 +34,48 @@ class ColumnHighlighter:
             self.active_columns.discard(COLUMN_KEYS[key])
 
     def draw(self, screen):
-        """Draw highlights for all currently active columns."""
-        for column in self.active_columns:
-            self.draw_column_highlight(screen, column)
+        """Draw highlights for all currently active columns and return the screen areas drawn."""
+        return [self.draw_column_highlight(screen, column) for column in self.active_columns]
 
     def draw_column_highlight(self, screen, column):
-        """Render a semi-transparent white rectangle over the given column."""
-        highlight = Quad(column)
-        highlight.color = (255, 255, 255, 60)  # Alpha channel
+        """Render a semi-transparent white rectangle over the given column and return its area."""
+        key = (screen.get_size(), get_camera_version())
+        if key != self.overlay_key: # Screen or camera changed, so every overlay is stale
+            self.overlays = {
+                col: self.render_column_highlight(screen.get_rect(), col)
+                for col in COLUMN_KEYS.values()
+            }
+            self.overlay_key = key
+
+        surface, position = self.overlays[column]
+        return screen.blit(surface, position)
+
+    def render_column_highlight(self, screen_rect, column):
+        """
+        Pre-render the highlight of a column onto a surface just big enough to hold it.
 
+        Returns:
+            (surface, position): The overlay and where to blit it on the screen.
+        """
         # Define 3D vertices of the column highlight
-        highlight.vertices_3D = np.array([
-            np.array([5, 0, START_Z]), 
-            np.array([5 - LINE_SPACING, 0, START_Z]),
-            np.array([5 - LINE_SPACING, 0, 10]),
-            np.array([5, 0, 10]),
+        left_x, right_x = column_x_edges(column)
+        vertices_3D = np.array([
+            [left_x, 0, START_Z],
+            [right_x, 0, START_Z],
+            [right_x, 0, 10],
+            [left_x, 0, 10],
         ])
 
-        # Shift the quad to the correct column using X-offset
-        x_offset = (column - (NUM_LINES + 3) / 2) * LINE_SPACING
-        highlight.vertices_3D[:, 0] += x_offset  
-
         # Convert vertices to 2D
-        verts_2D = [
-            world_to_screen(np.array(highlight.vertices_3D[0])),
-            world_to_screen(np.array(highlight.vertices_3D[1])),
-            world_to_screen(np.array(highlight.vertices_3D[2])),
-            world_to_screen(np.array(highlight.vertices_3D[3]))
-        ]
+        verts_2D = get_lut().project(vertices_3D)
 
-        # Make opaque
-        temp_surface = pygame.Surface((SCREEN_WIDTH, SCREEN_HEIGHT), pygame.SRCALPHA)
-        pygame.draw.polygon(temp_surface, highlight.color, verts_2D)
-        screen.blit(temp_surface, (0, 0))
+        # Bound the polygon by the part of it that is on screen
+        left, top = np.floor(verts_2D.min(axis=0))
+        right, bottom = np.ceil(verts_2D.max(axis=0)) + 1
+        bounds = pygame.Rect(left, top, right - left, bottom - top).clip(screen_rect)
 
-    
\ No newline at end of file
+        # Make opaque
+        surface = pygame.Surface(bounds.size, pygame.SRCALPHA)
+        counters.surfaces += 1
+        pygame.draw.polygon(surface, HIGHLIGHT_COLOR, verts_2D - bounds.topleft)
+        return surface, bounds.topleft
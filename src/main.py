@@ -1,8 +1,44 @@
+import argparse
+import os
+import time
+from src.constants import DEFAULT_CHART, RENDER_FPS, AUDIO_BUFFER_SIZE, AUDIO_FREQUENCY, REPLAY_DIR
 from src.game import GameManager
+from src.practice import PracticeSession
 
 def main():
-    game = GameManager()
+    parser = argparse.ArgumentParser(description="Play Note Rush.")
+    parser.add_argument("chart", nargs="?", default=DEFAULT_CHART, help="chart file to play (.chart or .nrc)")
+    parser.add_argument("--dirty-rects", action="store_true", help="only present the parts of the screen that changed each frame")
+    parser.add_argument("--fps", type=int, default=RENDER_FPS, help="render frame cap, 0 for uncapped")
+    parser.add_argument("--profile", action="store_true", help="show the frame profiler overlay (toggle with F3)")
+    parser.add_argument("--trace", help="write a Chrome trace of the last frames to this file on exit")
+    parser.add_argument("--audio-buffer", type=int, default=AUDIO_BUFFER_SIZE, help="mixer buffer size in samples (smaller is lower latency)")
+    parser.add_argument("--audio-frequency", type=int, default=AUDIO_FREQUENCY, help="mixer sample rate in Hz")
+    parser.add_argument("--calibrate", action="store_true", help="measure and save your audio offset before playing")
+    parser.add_argument("--start", type=float, default=0.0, help="practice: start playing at this song time in seconds")
+    parser.add_argument("--loop-end", type=float, help="practice: jump back to --start whenever the song reaches this time")
+    parser.add_argument("--rate", type=float, default=1.0, help="practice: playback speed (the song is silent unless it is 1)")
+    parser.add_argument("--replay", help=f"where to record the session's replay (default: a new file in {REPLAY_DIR}/)")
+    parser.add_argument("--no-replay", action="store_true", help="do not record a replay")
+    args = parser.parse_args()
+
+    practice = None
+    if args.start or args.loop_end is not None or args.rate != 1.0:
+        try:
+            practice = PracticeSession(args.start, args.loop_end, args.rate)
+        except ValueError as e:
+            parser.error(str(e))
+
+    replay_path = None
+    if not args.no_replay:
+        replay_path = args.replay or os.path.join(REPLAY_DIR, time.strftime("%Y%m%d-%H%M%S") + ".nrr")
+
+    game = GameManager(args.chart, dirty_rects=args.dirty_rects, show_profiler=args.profile, trace_path=args.trace,
+                       render_fps=args.fps, audio_buffer=args.audio_buffer,
+                       audio_frequency=args.audio_frequency, practice=practice, replay_path=replay_path)
+    if args.calibrate:
+        game.calibrate()
     game.run()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
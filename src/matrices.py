@@ -3,9 +3,30 @@
 #
 # Defines all projection matrices and conversions
 # Includes model, view, world, and projection matrices
+#
+# The composed WORLD --> CLIP matrix is cached and only rebuilt when
+# the camera parameters change (see set_camera). project_points
+# projects a whole (N, 3) array of world points in one pass.
+# The depth interval of the highway that is on screen is cached the
+# same way (see visible_z_range), so off-screen notes can be skipped
+# without projecting them.
 # -------------------------------------------------------------------
 import numpy as np
 from src.constants import *
+from src.profiler import counters
+
+# Camera parameters used to build the cached world to clip matrix
+_camera = {
+    "pitch": CAMERA_PITCH,
+    "height": CAMERA_HEIGHT,
+    "fov": FOV,
+    "near": NEAR_PLANE,
+    "far": FAR_PLANE,
+    "screen_size": (SCREEN_WIDTH, SCREEN_HEIGHT),
+}
+_world_to_clip = None
+_visible_z = None
+_camera_version = 0
 
 # LOCAL --> WORLD
 def create_model_matrix(trans_x, trans_y, trans_z):
@@ -20,39 +41,37 @@ def create_model_matrix(trans_x, trans_y, trans_z):
     ])
 
 # WORLD --> VIEW
-def create_view_matrix():
+def create_view_matrix(pitch_degrees=CAMERA_PITCH, camera_height=CAMERA_HEIGHT):
     """
     Return a view matrix to translate an object in view space.
     """
-    pitch = np.radians(20)
+    pitch = np.radians(pitch_degrees)
     cos_p = np.cos(pitch)
     sin_p = np.sin(pitch)
-    
+
     rot_x = np.array([
         [1, 0, 0, 0],
         [0, cos_p, -sin_p, 0],
         [0, sin_p,  cos_p, 0],
         [0, 0, 0, 1]
     ])
-    
+
     trans = np.array([
         [1, 0, 0, 0],
-        [0, 1, 0, -13],
+        [0, 1, 0, -camera_height],
         [0, 0, 1, 0],
         [0, 0, 0, 1]
     ])
-    
+
     return rot_x @ trans
 
 # VIEW --> CLIP (PERSPECTIVE)
-def create_perspective_matrix():
+def create_perspective_matrix(fov=FOV, near=NEAR_PLANE, far=FAR_PLANE, aspect=SCREEN_WIDTH / SCREEN_HEIGHT):
     """
     Return a view perspective to translate an object in clip space.
     """
-    n = NEAR_PLANE
-    f = FAR_PLANE
-    fov = FOV
-    aspect = SCREEN_WIDTH / SCREEN_HEIGHT
+    n = near
+    f = far
 
     return np.array([
         [1 / (aspect * np.tan(fov / 2)), 0, 0, 0],
@@ -61,33 +80,110 @@ def create_perspective_matrix():
         [0, 0, -1, 0]
     ])
 
-def world_to_screen(world_coord):
+# CAMERA STATE
+def set_camera(**params):
     """
-    Convert a point from world coordinates to 2D screen coordinates.
+    Update one or more camera parameters (pitch, height, fov, near, far,
+    screen_size) and invalidate the cached world to clip matrix.
     """
-    world_to_clip = create_perspective_matrix() @ create_view_matrix()
-    world_coord_h = np.append(world_coord, 1)
+    global _world_to_clip, _visible_z, _camera_version
+    for name in params:
+        if name not in _camera:
+            raise KeyError(f"Unknown camera parameter: {name}")
+    _camera.update(params)
+    _world_to_clip = None
+    _visible_z = None
+    _camera_version += 1
 
-    clip_coord = world_to_clip @ world_coord_h
+def get_camera():
+    """Return a copy of the current camera parameters."""
+    return dict(_camera)
 
-    # Reject point if it's behind the camera (z < 0) or w == 0
-    if clip_coord[3] == 0 or clip_coord[2] > 0:
-        return None
+def get_camera_version():
+    """Return a counter that increases every time the camera changes."""
+    return _camera_version
+
+def get_world_to_clip():
+    """
+    Return the composed WORLD --> CLIP matrix, building it only when the
+    camera parameters have changed since the last call.
+    """
+    global _world_to_clip
+    if _world_to_clip is None:
+        width, height = _camera["screen_size"]
+        perspective = create_perspective_matrix(_camera["fov"], _camera["near"], _camera["far"], width / height)
+        view = create_view_matrix(_camera["pitch"], _camera["height"])
+        _world_to_clip = perspective @ view
+    return _world_to_clip
+
+def visible_z_range():
+    """
+    Return the (near, far) world z interval of the y = 0 highway that lies
+    between the bottom and top edges of the screen. Computed once per camera.
+    """
+    global _visible_z
+    if _visible_z is None:
+        m = get_world_to_clip()
+        height = _camera["screen_size"][1]
+        # On y = 0 the screen y of depth z is ((a z + b) / (c z + d) - 1) / 2 * height
+        # (see project_points), which is solved for z at both screen edges
+        a, b = m[1, 2], m[1, 3]
+        c, d = m[3, 2], m[3, 3]
+        edges = []
+        for screen_y in (0, height):
+            ndc_y = 2 * screen_y / height + 1
+            edges.append((ndc_y * d - b) / (a - ndc_y * c))
+        _visible_z = (min(edges), max(edges))
+    return _visible_z
 
-    ndc = clip_coord[:3] / clip_coord[3]
+def project_points(world_coords):
+    """
+    Convert an (N, 3) array of world coordinates to 2D screen coordinates.
+
+    Returns:
+        (screen_coords, valid): An (N, 2) float array and an (N,) bool mask.
+        Rows where valid is False could not be projected and hold NaN.
+    """
+    points = np.asarray(world_coords, dtype=float).reshape(-1, 3)
+    world_to_clip = get_world_to_clip()
+    counters.projections += len(points)
+
+    # Same as world_to_clip @ [x, y, z, 1] for every row
+    clip = points @ world_to_clip[:, :3].T + world_to_clip[:, 3]
+    w = clip[:, 3]
+
+    # Reject points behind the camera (z > 0) or with w == 0
+    valid = (w != 0) & (clip[:, 2] <= 0)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ndc = clip[:, :3] / w[:, None]
 
     # Reject if NDCs are out of range or invalid
-    if not np.all(np.isfinite(ndc)) or np.any(np.abs(ndc) > 10):
-        return None
+    valid &= np.all(np.isfinite(ndc), axis=1) & np.all(np.abs(ndc) <= 10, axis=1)
 
-    return convert_to_screen(ndc[0], ndc[1], ndc[2])
+    width, height = _camera["screen_size"]
+    screen = np.empty((len(points), 2))
+    screen[:, 0] = ((ndc[:, 0] + 1) / 2) * width
+    screen[:, 1] = ((ndc[:, 1] - 1) / 2) * height
+    screen[~valid] = np.nan
+
+    return screen, valid
+
+def world_to_screen(world_coord):
+    """
+    Convert a point from world coordinates to 2D screen coordinates.
+    """
+    screen, valid = project_points(world_coord)
+    if not valid[0]:
+        return None
+    return screen[0, 0], screen[0, 1]
 
 # Convert to screen coordinates
 def convert_to_screen(x, y, z):
     """
     Convert normalized device coordinates to 2D screen space.
     """
-    x_screen = ((x + 1) / 2) * SCREEN_WIDTH 
+    x_screen = ((x + 1) / 2) * SCREEN_WIDTH
     y_screen = ((y - 1) / 2) * SCREEN_HEIGHT
 
     return x_screen, y_screen
@@ -0,0 +1,258 @@
+# -------------------------------------------------------------------
+# note_field.py
+#
+# Structure-of-arrays engine that owns every active note.
+# Each note lives in a slot of a set of contiguous NumPy arrays
+# (column, kind, head/tail arrival times, hold state, hit flag), so miss
+# detection and removal run as one vectorized step per frame. The ShortNote/LongNote classes in
+# notes.py are thin views that point at a slot. A ColumnIndex keeps
+# each column's upcoming notes in arrival order for key handling.
+#
+# Notes are not moved. A note stores the song times at which its head
+# and tail reach the judgment line, and its depth at any song time is
+# computed in closed form (see head_z/tail_z) only when it is drawn,
+# and only for notes that overlap the on-screen depth interval.
+# Positions therefore never drift, and any song time can be shown
+# without stepping through the ones before it.
+#
+# The "head" of a note is the edge closest to the player (the bottom
+# of the quad) and the "tail" is the far edge (the top of the quad).
+# -------------------------------------------------------------------
+import pygame
+from src.constants import *
+from src.matrices import visible_z_range
+from src.projection_lut import get_lut, column_edge_indices
+from src.profiler import counters
+from src.shapes import COLUMN_COLORS, DEFAULT_COLUMN_COLOR, column_x_edges
+from src.column_index import ColumnIndex
+from src.sprites import SpriteCache
+
+# Note kinds
+SHORT = 0
+LONG = 1
+
+class NoteField:
+    def __init__(self, capacity=64, sprites=True):
+        """
+        Allocate storage for `capacity` notes; it grows as needed.
+        With sprites, short notes are drawn from a SpriteCache instead of as polygons.
+        """
+        self.capacity = 0
+        self.size = 0 # One past the highest slot ever used
+        self.free_slots = []
+        self.views = []
+        self.columns = ColumnIndex() # Per-column lookup for key presses
+        self.time = 0.0 # Song time of the last update
+        self.sprites = SpriteCache() if sprites else None
+
+        self.column = np.zeros(0, dtype=np.int8)
+        self.kind = np.zeros(0, dtype=np.int8)
+        self.head_time = np.zeros(0) # Song time the head reaches the judgment line
+        self.tail_time = np.zeros(0) # Song time the tail reaches the judgment line
+        self.active = np.zeros(0, dtype=bool)
+        self.hit = np.zeros(0, dtype=bool) # Judged; removed at the next update
+        self.hold_state = np.zeros(0, dtype=np.int8) # APPROACHING, HELD, RELEASED or MISSED
+
+        self._grow(capacity)
+
+    _ARRAYS = ("column", "kind", "head_time", "tail_time", "active", "hit", "hold_state")
+
+    def _grow(self, capacity):
+        """Resize every array to hold `capacity` slots."""
+        for name in self._ARRAYS:
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=old.dtype)
+            new[:len(old)] = old
+            setattr(self, name, new)
+        self.views.extend([None] * (capacity - self.capacity))
+        self.capacity = capacity
+
+    def __len__(self):
+        return int(np.count_nonzero(self.active[:self.size]))
+
+    def __iter__(self):
+        """Iterate over the views of every active note."""
+        for i in self.active_slots():
+            yield self.views[i]
+
+    def active_slots(self):
+        """Return the slot indices of every active note."""
+        return np.flatnonzero(self.active[:self.size])
+
+    def add(self, note):
+        """Attach a note's view to a slot, timed from the note's spawn time."""
+        if self.free_slots:
+            i = self.free_slots.pop()
+        else:
+            if self.size == self.capacity:
+                self._grow(self.capacity * 2)
+            i = self.size
+            self.size += 1
+
+        self.column[i] = note.column
+        self.kind[i] = note.kind
+        self.head_time[i] = note.head_time
+        self.tail_time[i] = note.tail_time
+        self.active[i] = True
+        self.hit[i] = False
+        self.hold_state[i] = APPROACHING
+
+        self.views[i] = note
+        note.field = self
+        note.index = i
+        self.columns.add(note)
+
+    _STATE = ("hit", "hold_state")
+
+    def remove(self, slots):
+        """Free the given slots so they can be reused."""
+        for i in slots:
+            note = self.views[i]
+            # Keep the final state readable from the detached view
+            note.state = {name: getattr(self, name)[i].item() for name in self._STATE}
+            note.index = -1
+            self.views[i] = None
+            self.columns.discard(note)
+        self.active[slots] = False
+        self.free_slots.extend(slots.tolist())
+
+    def clear(self):
+        """Remove every note, e.g. before jumping to another point of the song."""
+        self.remove(self.active_slots())
+        self.columns = ColumnIndex()
+
+    def tail_z(self, slots, now):
+        """Return the depth of the given notes' tails at song time `now`."""
+        return JUDGMENT + Z_VELOCITY * (self.tail_time[slots] - now)
+
+    def head_z(self, slots, now):
+        """
+        Return the depth of the given notes' heads at song time `now`.
+        Heads of held long notes stop at the judgment line.
+        """
+        z = JUDGMENT + Z_VELOCITY * (self.head_time[slots] - now)
+        return np.where(self.hold_state[slots] == HELD, np.maximum(z, JUDGMENT), z)
+
+    def update(self, now):
+        """
+        Bring the field up to song time `now`.
+
+        Removes notes that were hit last step or have passed the judgment
+        line. Only arrival times are compared; no positions are computed.
+
+        Long notes step through their hold states here, all at once:
+        APPROACHING -> MISSED once the head passes without a hold, and
+        HELD -> RELEASED once the tail passes while still held. Key presses
+        and releases make the other transitions (see GameManager).
+
+        Returns:
+            A list of the long notes that were missed this step.
+        """
+        self.time = now
+        slots = self.active_slots()
+
+        # Notes that were hit are removed
+        done = self.hit[slots]
+        self.remove(slots[done])
+        slots = slots[~done]
+
+        head_late = now - self.head_time[slots]
+        tail_late = now - self.tail_time[slots]
+        is_long = self.kind[slots] == LONG
+        state = self.hold_state[slots]
+        head_gone = head_late > MISS_TIME
+
+        missed = is_long & (state == APPROACHING) & head_gone
+        held_through = (state == HELD) & (tail_late > MISS_TIME)
+        short_gone = ~is_long & head_gone
+
+        self.hold_state[slots[missed]] = MISSED
+        self.hold_state[slots[held_through]] = RELEASED
+        missed_notes = [self.views[i] for i in slots[missed]]
+
+        gone = missed | held_through | short_gone
+        self.remove(slots[gone])
+        return missed_notes
+
+    def vertices_3D(self, slots, now=None):
+        """
+        Build the world-space quad of each given note at song time `now`
+        (the last update by default) as an (N, 4, 3) array.
+        Vertices are ordered top-left, top-right, bottom-right, bottom-left.
+        """
+        if now is None:
+            now = self.time
+        left_x, right_x = column_x_edges(self.column[slots].astype(float))
+        verts = np.zeros((len(slots), 4, 3))
+        verts[:, 0, 0] = verts[:, 3, 0] = left_x
+        verts[:, 1, 0] = verts[:, 2, 0] = right_x
+        verts[:, 0:2, 2] = self.tail_z(slots, now)[:, None]
+        verts[:, 2:4, 2] = self.head_z(slots, now)[:, None]
+        return verts
+
+    def project(self, slots, now=None):
+        """
+        Look up the screen quads of the given notes at song time `now` in the
+        projection table, in one pass and without any matrix math.
+
+        Returns:
+            (vertices_2D, valid): An (N, 4, 2) array and an (N,) bool mask
+            that is False for notes reaching outside the table's depth range.
+        """
+        if now is None:
+            now = self.time
+        lut = get_lut()
+        head_z, tail_z = self.head_z(slots, now), self.tail_z(slots, now)
+        left, right = column_edge_indices(self.column[slots])
+        valid = (head_z >= lut.z[0]) & (tail_z <= lut.z[-1])
+        return lut.project_quads(left, right, tail_z, head_z), valid
+
+    def is_visible(self, slots, now=None):
+        """
+        Return a mask of the given notes that overlap the on-screen depth interval
+        at song time `now`, compared on arrival times so nothing is projected.
+        """
+        if now is None:
+            now = self.time
+        near, far = visible_z_range()
+        # A note is on screen from when its head reaches the far edge until its tail passes the near edge
+        return (self.head_time[slots] <= now + (far - JUDGMENT) / Z_VELOCITY) & \
+               (self.tail_time[slots] >= now + (near - JUDGMENT) / Z_VELOCITY)
+
+    def visible_slots(self, now=None):
+        """Return the slots of the active notes that are on screen at song time `now`."""
+        slots = self.active_slots()
+        return slots[self.is_visible(slots, now)]
+
+    def draw(self, screen, now=None):
+        """
+        Render every on-screen note as it stands at song time `now` and return
+        the screen areas drawn. Rendering can run ahead of the last update.
+        Short notes are composited from cached sprites in one blits call;
+        long notes, short notes that do not fit in the sprite cache, frames with
+        fewer than SPRITE_MIN_NOTES short notes and every note without a sprite
+        cache are drawn as polygons.
+        """
+        slots = self.visible_slots(now)
+        counters.visible_notes += len(slots)
+        verts_2D, valid = self.project(slots, now)
+        slots, verts_2D = slots[valid], verts_2D[valid]
+
+        rects = []
+        short = np.flatnonzero(self.kind[slots] == SHORT) if self.sprites is not None else []
+        if len(short) >= SPRITE_MIN_NOTES: # Below that, the sprite bookkeeping costs more than it saves
+            pairs, missing = self.sprites.blits(self.column[slots[short]], verts_2D[short])
+            rects = screen.blits(pairs)
+            # Short notes left without a sprite once the cache is full are drawn with the long notes
+            polygons = np.ones(len(slots), dtype=bool)
+            polygons[short[~missing]] = False
+            slots, verts_2D = slots[polygons], verts_2D[polygons]
+
+        rects.extend(draw_note_quad(screen, self.column[i], v2d) for i, v2d in zip(slots, verts_2D))
+        return rects
+
+def draw_note_quad(screen, column, v2d):
+    """Render a single projected note quad with its outline and return the area drawn."""
+    color = COLUMN_COLORS.get(int(column), DEFAULT_COLUMN_COLOR)
+    rect = pygame.draw.polygon(screen, color, v2d)
+    return rect.union(pygame.draw.lines(screen, (255, 255, 255), True, v2d, 1))
@@ -3,114 +3,109 @@
 #
 # Defines the Note classes
 # Includes ShortNote and LongNote, which inherit from a base Note class.
-# Handles note behavior, rendering, movement, and hit detection logic.
+# Notes are thin views over a slot in a NoteField (see note_field.py),
+# which owns their arrival times, hit flag and hold state and updates them in bulk.
+# Views use __slots__ and share their class-level defaults, so a spawned note
+# costs a few dozen bytes on top of its field slot, even in 100k-note charts.
 # -------------------------------------------------------------------
-import pygame 
 from src.constants import *
-from src.matrices import world_to_screen
-from src.shapes import Quad
+from src.note_field import SHORT, LONG, draw_note_quad
 
 print ("hello")
+
+class _SlotValue:
+    """A note attribute stored in the note's NoteField slot while it is active."""
+    def __init__(self, cast, default):
+        self.cast = cast
+        self.default = default
+
+    def __set_name__(self, owner, name):
+        self.name = name
+
+    def __get__(self, note, owner=None):
+        if note is None:
+            return self
+        if note.index < 0:
+            if note.state is None:
+                return self.default
+            return note.state.get(self.name, self.default)
+        return self.cast(getattr(note.field, self.name)[note.index])
+
+    def __set__(self, note, value):
+        if note.index < 0:
+            if note.state is None:
+                note.state = {}
+            note.state[self.name] = value
+        else:
+            getattr(note.field, self.name)[note.index] = value
+
 # Base Note class
 class Note:
-    def __init__(self, column):
-        """Initialize a note in the specified column."""
+    __slots__ = ("column", "length", "spawn_time", "field", "index", "state")
+    kind = SHORT
+    hit = _SlotValue(bool, False)
+    hold_state = _SlotValue(int, APPROACHING)
+
+    def __init__(self, column, length=SHORT_NOTE_LENGTH, spawn_time=0.0):
+        """Initialize a note in the specified column that spawns at `spawn_time` song seconds."""
         self.column = column
-        self.hit = False
-        self.object = Quad(self.column)
-   
-    def update(self, dt):
-        """Update the note's 3D position and project it to 2D screen space."""
-        self.object.vertices_3D[:, 2] -= Z_VELOCITY * dt
-
-        # Only project valid points
-        verts_2D = []
-        for v in self.object.vertices_3D:
-            screen_pos = world_to_screen(v)
-            if screen_pos is None:
-                self.object.vertices_2D = None
-                return
-            verts_2D.append(screen_pos)
-
-        self.object.vertices_2D = np.array(verts_2D)
+        self.length = length
+        self.spawn_time = spawn_time
+        self.field = None
+        self.index = -1 # Slot in the field, -1 when not spawned
+        self.state = None # Slot values while the note is not in a field, created on first write
 
-    def draw(self, screen):
-        """Render the note on screen with its outline."""
-        if self.object.vertices_2D is None:
-            return
+    @property
+    def vertices_3D(self):
+        """Return the note's world-space quad as a (4, 3) array."""
+        return self.field.vertices_3D([self.index])[0]
 
-        v2d = self.object.vertices_2D
-        if np.all(v2d[:, 1] > SCREEN_HEIGHT): # Color black when off the screen
-            color = (0, 0, 0)
-        else:
-            color = self.object.color
+    @property
+    def head_time(self):
+        """Song time at which the bottom face of the note reaches the judgment line."""
+        return self.spawn_time + TIME_AT_JUDGMENT - self.length / Z_VELOCITY
+
+    @property
+    def tail_time(self):
+        """Song time at which the top face of the note reaches the judgment line."""
+        return self.spawn_time + TIME_AT_JUDGMENT
+
+    def get_testing_z(self):
+        """Return the Z-depth of the bottom face of the note."""
+        return self.field.head_z([self.index], self.field.time)[0]
 
-        pygame.draw.polygon(screen, color, v2d)
-        pygame.draw.lines(screen, (255, 255, 255), True, v2d, 1)
+    def draw(self, screen):
+        """Render the note on screen with its outline, unless it is off screen."""
+        if not self.field.is_visible([self.index])[0]:
+            return
+        verts_2D, valid = self.field.project([self.index])
+        if valid[0]:
+            draw_note_quad(screen, self.column, verts_2D[0])
 
 # ShortNote class
 class ShortNote(Note):
-    def __init__(self, column):
+    __slots__ = ()
+
+    def __init__(self, column, spawn_time=0.0):
         """Create a short (tap) note in the specified column."""
-        super().__init__(column)
+        super().__init__(column, spawn_time=spawn_time)
 
-# LongNote 
+# LongNote
 class LongNote(Note):
-    def __init__(self, column, length):
-        super().__init__(column)
-        self.length = length
-        self.object = Quad(self.column, length)
-
-        # Add new state variables
-        self.being_held = False
-        self.hold_started = False
-        self.hold_completed = False
-        
-    def fix_vertices(self, y_bound, dt):
-        """
-        Control how each vertex of the note moves:
-        Top vertices always move.
-        Bottom vertices stop if the note is being held.
-        """
-        for i in range(4):
-            v = self.object.vertices_3D[i]
-            screen_pos = world_to_screen(v)
-
-            if screen_pos is None:
-                continue
-
-            # Always move top vertices
-            if i in (0, 1):
-                self.object.vertices_3D[i, 2] -= Z_VELOCITY * dt
-            # Move bottom vertices only if above judgment line or not being held
-            elif not self.being_held or self.object.vertices_3D[i, 2] > JUDGMENT:
-                self.object.vertices_3D[i, 2] -= Z_VELOCITY * dt
-            # When being held, fix bottom vertices at judgment line
-            elif self.being_held and self.object.vertices_3D[i, 2] <= JUDGMENT:
-                self.object.vertices_3D[i, 2] = JUDGMENT
-
-    def update(self, dt):
-        """Update position and re-project vertices to 2D screen space."""
-        # Use judgment line instead of screen height
-        self.fix_vertices(JUDGMENT, dt)
-
-        # Re-project to 2D after update
-        verts_2D = []
-        for v in self.object.vertices_3D:
-            screen_pos = world_to_screen(v)
-            if screen_pos is None:
-                self.object.vertices_2D = None
-                return
-            verts_2D.append(screen_pos)
-
-        self.object.vertices_2D = np.array(verts_2D)
-    
-    def is_top_in_judgment_zone(self):
-        """Check if the top of the long note is within the judgment zone."""
-        top_z = min(self.object.vertices_3D[0][2], self.object.vertices_3D[1][2])
-        return JUDGMENT - 1.8 <= top_z <= JUDGMENT + 1.8
-    
-    def is_bottom_in_judgment_zone(self):
-        """Check if the bottom of the long note is within the judgment zone."""
-        bottom_z = min(self.object.vertices_3D[2][2], self.object.vertices_3D[3][2])
-        return JUDGMENT - 1.8 <= bottom_z <= JUDGMENT + 1.8
\ No newline at end of file
+    __slots__ = ()
+    kind = LONG
+
+    def __init__(self, column, length, spawn_time=0.0):
+        super().__init__(column, length, spawn_time)
+
+    def is_top_in_judgment_zone(self, now=None):
+        """Check if the top of the long note is within the judgment zone at song time `now`."""
+        if now is None:
+            now = self.field.time
+        return abs(now - self.tail_time) <= HIT_WINDOW
+
+    def is_bottom_in_judgment_zone(self, now=None):
+        """Check if the bottom of the long note is within the judgment zone at song time `now`."""
+        if now is None:
+            now = self.field.time
+        return abs(now - self.head_time) <= HIT_WINDOW
@@ -0,0 +1,63 @@
+# -------------------------------------------------------------
+# practice.py
+#
+# Practice mode: start a song at any time, loop a section of it and
+# change the playback rate.
+# Note positions are a closed-form function of song time, so jumping
+# to a time only needs the notes that are on the field at that time.
+# An IntervalIndex over every note's time on the field (from its spawn
+# until it is gone) finds them with two binary searches, so a seek
+# costs the same at the start and in the middle of a long chart.
+# -------------------------------------------------------------
+from src.constants import *
+
+class IntervalIndex:
+    def __init__(self, starts, ends):
+        """Index the intervals [starts[i], ends[i]), where starts is sorted."""
+        self.starts = np.asarray(starts, dtype=float)
+        self.ends = np.asarray(ends, dtype=float)
+        # No interval is longer than this, so a query only searches back this far
+        self.max_duration = float((self.ends - self.starts).max()) if len(self.starts) else 0.0
+
+    @classmethod
+    def from_chart(cls, chart):
+        """Index the time each note of a Chart spends on the field."""
+        # Whether hit, held or missed, every note is gone once its tail is MISS_TIME late
+        return cls(chart.spawn_times, chart.notes["tail_time"] + MISS_TIME)
+
+    def __len__(self):
+        return len(self.starts)
+
+    def query(self, t):
+        """
+        Return the indices of the intervals that contain time t, in start
+        order, and the index of the first interval that starts after t.
+        """
+        first = np.searchsorted(self.starts, t - self.max_duration, side="left")
+        after = int(np.searchsorted(self.starts, t, side="right"))
+        overlapping = first + np.flatnonzero(self.ends[first:after] > t)
+        return overlapping, after
+
+class PracticeSession:
+    def __init__(self, start=0.0, loop_end=None, rate=1.0, repeats=None):
+        """
+        Play from song time `start`. With loop_end, jump back to start whenever the
+        song reaches loop_end, `repeats` times (forever by default).
+        rate is the playback speed; the song is only heard at a rate of 1, since
+        pygame.mixer.music cannot change speed.
+        """
+        if loop_end is not None and loop_end <= start:
+            raise ValueError(f"Loop end {loop_end} must come after the start {start}")
+        if rate <= 0:
+            raise ValueError(f"Playback rate must be positive, not {rate}")
+        self.start = start
+        self.loop_end = loop_end
+        self.rate = rate
+        self.repeats = repeats
+        self.loops = 0 # Times the section has been looped so far
+
+    def loop_due(self, now):
+        """Return True if the song should jump back to the start of the loop at song time `now`."""
+        if self.loop_end is None or now < self.loop_end:
+            return False
+        return self.repeats is None or self.loops < self.repeats
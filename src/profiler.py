@@ -0,0 +1,144 @@
+# -------------------------------------------------------------
+# profiler.py
+#
+# Per-phase frame profiler for the game loop.
+# Each frame is split into phases (events, spawning, note update,
+# drawing, highlights, HUD, display presentation). The time spent in
+# each phase and a few counters are written into a fixed-size ring
+# buffer, which can be summarised as p50/p99 frame times, drawn as an
+# on-screen overlay, or exported as a Chrome trace event file that
+# chrome://tracing and Perfetto can open.
+# -------------------------------------------------------------
+import json
+import time
+import numpy as np
+import pygame
+
+# Frame phases, in the order they run
+EVENTS, SPAWN, NOTES, DRAW, HIGHLIGHT, HUD, PRESENT = range(7)
+PHASE_NAMES = ("events", "spawn", "notes", "draw", "highlight", "hud", "present")
+
+# Per-frame counters
+COUNTER_NAMES = ("active_notes", "visible_notes", "projections", "surfaces")
+
+class FrameCounters:
+    """Running totals that other modules bump while a frame is built."""
+    __slots__ = ("visible_notes", "projections", "surfaces")
+
+    def __init__(self):
+        self.visible_notes = 0 # Notes on screen, the rest were culled without projecting
+        self.projections = 0 # World points projected to the screen, by matrix or lookup table
+        self.surfaces = 0 # pygame Surfaces allocated
+
+counters = FrameCounters()
+
+class FrameProfiler:
+    def __init__(self, capacity=600):
+        """Keep phase timings and counters for the last `capacity` frames."""
+        self.capacity = capacity
+        self.durations = np.zeros((capacity, len(PHASE_NAMES)), dtype=np.int64) # Nanoseconds
+        self.starts = np.zeros(capacity, dtype=np.int64)
+        self.counts = np.zeros((capacity, len(COUNTER_NAMES)), dtype=np.int64)
+        self.frames = 0 # Frames recorded in total
+        self.row = 0
+        self.last_mark = 0
+
+        # Overlay, re-rendered every few frames
+        self.overlay = None
+        self.overlay_frame = -1
+        self.font = None
+
+    def begin_frame(self):
+        """Start timing a new frame."""
+        self.row = self.frames % self.capacity
+        self.last_mark = time.perf_counter_ns()
+        self.starts[self.row] = self.last_mark
+        self.durations[self.row] = 0
+        counters.visible_notes = 0
+        counters.projections = 0
+        counters.surfaces = 0
+
+    def mark(self, phase):
+        """Charge the time since the last mark to `phase`."""
+        now = time.perf_counter_ns()
+        self.durations[self.row, phase] += now - self.last_mark
+        self.last_mark = now
+
+    def end_frame(self, active_notes=0):
+        """Store the frame's counters and move on to the next row."""
+        self.counts[self.row] = (active_notes, counters.visible_notes, counters.projections, counters.surfaces)
+        self.frames += 1
+
+    def recorded(self):
+        """Return the ring buffer rows that hold frames, oldest first."""
+        if self.frames < self.capacity:
+            return np.arange(self.frames)
+        return (np.arange(self.capacity) + self.frames) % self.capacity
+
+    def summary(self):
+        """
+        Return p50 and p99 times in milliseconds for each phase and the whole frame,
+        plus the mean of each counter, over the buffered frames.
+        """
+        rows = self.recorded()
+        if len(rows) == 0:
+            return {}
+        durations = self.durations[rows] / 1e6
+        summary = {}
+        for i, name in enumerate(PHASE_NAMES):
+            summary[name] = tuple(np.percentile(durations[:, i], (50, 99)))
+        summary["frame"] = tuple(np.percentile(durations.sum(axis=1), (50, 99)))
+        for i, name in enumerate(COUNTER_NAMES):
+            summary[name] = float(self.counts[rows, i].mean())
+        return summary
+
+    def draw_overlay(self, screen, refresh_every=30):
+        """Draw the p50/p99 table in the top right corner and return its area."""
+        if self.overlay is None or self.frames - self.overlay_frame >= refresh_every:
+            self.overlay = self.render_overlay()
+            self.overlay_frame = self.frames
+        rect = self.overlay.get_rect(topright=(screen.get_width() - 10, 10))
+        return screen.blit(self.overlay, rect)
+
+    def render_overlay(self):
+        """Render the profiler table onto a translucent surface."""
+        summary = self.summary()
+        lines = [f"{'phase':<10}{'p50':>8}{'p99':>8}"]
+        for name in PHASE_NAMES + ("frame",):
+            if name in summary:
+                p50, p99 = summary[name]
+                lines.append(f"{name:<10}{p50:>8.2f}{p99:>8.2f}")
+        for name in COUNTER_NAMES:
+            if name in summary:
+                lines.append(f"{name:<14}{summary[name]:>10.0f}")
+
+        if self.font is None:
+            self.font = pygame.font.SysFont("monospace", 16)
+        font = self.font
+        line_height = font.get_linesize()
+        surface = pygame.Surface((220, line_height * len(lines) + 8), pygame.SRCALPHA)
+        surface.fill((0, 0, 0, 170))
+        for i, line in enumerate(lines):
+            # Numbers change every refresh, so render directly instead of churning the text cache
+            surface.blit(font.render(line, True, (0, 255, 0)), (6, 4 + i * line_height))
+        return surface
+
+    def export_trace(self, path):
+        """Write the buffered frames as a Chrome trace event JSON file."""
+        events = []
+        rows = self.recorded()
+        origin = self.starts[rows[0]] if len(rows) else 0
+        for frame, row in enumerate(rows):
+            ts = (self.starts[row] - origin) / 1000 # Microseconds
+            events.append({"name": "frame", "ph": "X", "ts": ts, "dur": self.durations[row].sum() / 1000,
+                           "pid": 1, "tid": 1, "args": {"frame": frame}})
+            for i, name in enumerate(PHASE_NAMES):
+                dur = self.durations[row, i] / 1000
+                if dur:
+                    events.append({"name": name, "ph": "X", "ts": ts, "dur": dur, "pid": 1, "tid": 2})
+                ts += dur
+            events.append({"name": "counters", "ph": "C", "ts": (self.starts[row] - origin) / 1000, "pid": 1,
+                           "args": {name: int(self.counts[row, i]) for i, name in enumerate(COUNTER_NAMES)}})
+
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
@@ -0,0 +1,127 @@
+# -------------------------------------------------------------
+# projection_lut.py
+#
+# Depth-indexed projection lookup table for the highway.
+# Everything in the playfield lies on the y = 0 plane and the camera
+# only changes through set_camera, so a point's screen y depends on its
+# depth alone, and its screen x is a straight line in world x at any
+# given depth. The table samples, once per camera, the screen y of each
+# depth and the screen x of every lane edge at that depth; lookups
+# interpolate between samples instead of doing any matrix math.
+#
+# Samples are spaced geometrically in depth because the projection
+# changes fastest close to the camera. accuracy() compares the table
+# against project_points (see also the benchmark's ProjectionLUT cases).
+# -------------------------------------------------------------
+from src.constants import *
+from src.matrices import project_points, get_camera_version
+from src.profiler import counters
+
+def lane_edges():
+    """Return the world x of every lane edge (the column guide lines), left to right."""
+    return (np.arange(NUM_LINES) - NUM_LINES // 2) * LINE_SPACING
+
+def column_edge_indices(column):
+    """
+    Return the (left, right) lane edge indices of a column, or of an array of columns.
+    Column c spans the world x of edges c and c - 1 (see column_x_edges in shapes.py).
+    """
+    column = np.asarray(column, dtype=int)
+    return column, column - 1
+
+class ProjectionLUT:
+    def __init__(self, resolution=LUT_RESOLUTION, near_z=LUT_NEAR_Z, far_z=LUT_FAR_Z):
+        """Sample `resolution` depths between near_z and far_z with the current camera."""
+        self.camera_version = get_camera_version()
+        self.edges = lane_edges()
+        self.z = np.geomspace(near_z, far_z, resolution)
+        self.log_step = np.log(far_z / near_z) / (resolution - 1) # Samples are evenly spaced in log(z)
+
+        # Project every lane edge at every sampled depth in one pass
+        points = np.zeros((resolution, len(self.edges), 3))
+        points[:, :, 0] = self.edges
+        points[:, :, 2] = self.z[:, None]
+        screen, _ = project_points(points.reshape(-1, 3))
+        screen = screen.reshape(resolution, len(self.edges), 2)
+
+        self.screen_y = screen[:, 0, 1].copy() # (resolution,)
+        self.edge_x = screen[:, :, 0].T.copy() # (edges, resolution)
+
+    def locate(self, z):
+        """
+        Return the sample index below each depth and how far it is towards the next
+        sample. Depths outside the table are clamped to its ends.
+        """
+        z = np.clip(z, self.z[0], self.z[-1])
+        i = np.minimum((np.log(z / self.z[0]) / self.log_step).astype(int), len(self.z) - 2)
+        return i, (z - self.z[i]) / (self.z[i + 1] - self.z[i])
+
+    def y(self, z, location=None):
+        """Return the screen y of depth z (a number or an array); location is locate(z) if known."""
+        i, frac = location or self.locate(z)
+        return self.screen_y[i] + frac * (self.screen_y[i + 1] - self.screen_y[i])
+
+    def lane_x(self, edge, z, location=None):
+        """Return the screen x of lane edge `edge` (indices into lane_edges) at depth z."""
+        i, frac = location or self.locate(z)
+        return self.edge_x[edge, i] + frac * (self.edge_x[edge, i + 1] - self.edge_x[edge, i])
+
+    def project(self, points):
+        """
+        Look up the screen coordinates of an (N, 3) array of points on the
+        y = 0 plane. Returns an (N, 2) array, like project_points without the mask.
+        """
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        counters.projections += len(points)
+        x, z = points[:, 0], points[:, 2]
+        location = self.locate(z)
+        # Screen x is linear in world x at a fixed depth, so the outer edges give every x
+        first, last = self.lane_x(0, z, location), self.lane_x(-1, z, location)
+        t = (x - self.edges[0]) / (self.edges[-1] - self.edges[0])
+        return np.column_stack([first + t * (last - first), self.y(z, location)])
+
+    def project_quads(self, left_edges, right_edges, far_z, near_z):
+        """
+        Look up the screen quads spanning lane edges left_edges..right_edges (index arrays)
+        from depth far_z to near_z. Vertices are ordered top-left, top-right, bottom-right,
+        bottom-left, as in NoteField.vertices_3D. Returns an (N, 4, 2) array.
+        """
+        counters.projections += 4 * len(far_z)
+        far, near = self.locate(far_z), self.locate(near_z)
+        quads = np.empty((len(far_z), 4, 2))
+        quads[:, 0, 0] = self.lane_x(left_edges, far_z, far)
+        quads[:, 1, 0] = self.lane_x(right_edges, far_z, far)
+        quads[:, 2, 0] = self.lane_x(right_edges, near_z, near)
+        quads[:, 3, 0] = self.lane_x(left_edges, near_z, near)
+        quads[:, 0:2, 1] = self.y(far_z, far)[:, None]
+        quads[:, 2:4, 1] = self.y(near_z, near)[:, None]
+        return quads
+
+    def accuracy(self, samples=10_000, seed=0):
+        """
+        Return the largest distance in pixels between the table and project_points
+        over random points on the highway within the table's depth range, plus every
+        lane edge at every sampled depth and both ends of the judgment bars.
+        """
+        rng = np.random.default_rng(seed)
+        random_points = np.column_stack([
+            rng.uniform(self.edges[0], self.edges[-1], samples),
+            np.zeros(samples),
+            rng.uniform(self.z[0], self.z[-1], samples),
+        ])
+        lane_x, lane_z = np.meshgrid(self.edges, self.z)
+        lane_points = np.column_stack([lane_x.ravel(), np.zeros(lane_x.size), lane_z.ravel()])
+        judgment_points = np.array([[x, 0, z] for x in (-20, 20) for z in (JUDGMENT, JUDGMENT + 1.5)])
+        points = np.vstack([random_points, lane_points, judgment_points])
+        exact, valid = project_points(points)
+        error = np.linalg.norm(self.project(points) - exact, axis=1)
+        return float(error[valid].max())
+
+_lut = None
+
+def get_lut():
+    """Return the shared lookup table, rebuilding it when the camera has changed."""
+    global _lut
+    if _lut is None or _lut.camera_version != get_camera_version():
+        _lut = ProjectionLUT()
+    return _lut
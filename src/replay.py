@@ -0,0 +1,243 @@
+# -------------------------------------------------------------
+# replay.py
+#
+# Binary replays of play sessions, and a headless replay runner.
+#
+# Replay format (.nrr) - little-endian, fixed width, append-only:
+#
+#     header   HEADER_DTYPE (288 bytes): magic, version, simulation
+#              timestep, note count and path of the chart played
+#     records  RECORD_DTYPE (24 bytes each), in the order they happened
+#
+# Each record is a key press or release (with the key code), a seek
+# (practice mode), a judgment (with its points) or the end of the
+# session. Every record stores the song time it happened at and the
+# simulation time it was handled at, so the runner can step the game
+# exactly as the session did. Records are written through a
+# preallocated buffer that is flushed to disk whenever it fills up;
+# a file cut short by a crash is still readable up to its last flush.
+#
+# The runner feeds the recorded input back through the game and
+# records the replay again; the judgments it produces are compared
+# with the recorded ones.
+#
+#     python -m src.replay replays/<session>.nrr
+# -------------------------------------------------------------
+import argparse
+import io
+import os
+import sys
+import pygame
+from src.constants import *
+
+MAGIC = b"NRREPLAY"
+VERSION = 1
+
+HEADER_DTYPE = np.dtype([
+    ("magic", "S8"),
+    ("version", "<u4"),
+    ("count", "<u4"), # Notes in the chart
+    ("timestep", "<f8"), # Simulation step the session ran at
+    ("chart", "S264"),
+])
+
+RECORD_DTYPE = np.dtype([
+    ("time", "<f8"), # Song time of the event
+    ("step_time", "<f8"), # Simulation time it was handled at
+    ("value", "<i4"), # Key code, or points for a judgment
+    ("kind", "u1"),
+    ("judgment", "u1"), # Index into JUDGMENT_NAMES
+    ("pad", "V2"),
+])
+
+# Record kinds
+KEY_DOWN, KEY_UP, SEEK, JUDGMENT, END = range(5)
+
+JUDGMENT_NAMES = ("PERFECT!", "GREAT!", "GOOD", "OK", "MISS")
+_JUDGMENT_CODES = {name: i for i, name in enumerate(JUDGMENT_NAMES)}
+
+class ReplayWriter:
+    def __init__(self, file, chart_path, note_count, timestep=SIM_DT, buffer_size=REPLAY_BUFFER_RECORDS):
+        """
+        Start a replay in `file`, a path or a binary file object, for a session of
+        the given chart. Records are buffered `buffer_size` at a time.
+        """
+        chart = chart_path.encode()
+        if len(chart) > HEADER_DTYPE["chart"].itemsize:
+            raise ValueError(f"chart path is {len(chart)} bytes long, but at most "
+                             f"{HEADER_DTYPE['chart'].itemsize} fit in a replay")
+        self.owns_file = isinstance(file, str)
+        if self.owns_file:
+            os.makedirs(os.path.dirname(file) or ".", exist_ok=True)
+            file = open(file, "wb")
+        self.file = file
+
+        header = np.zeros(1, dtype=HEADER_DTYPE)
+        header["magic"] = MAGIC
+        header["version"] = VERSION
+        header["count"] = note_count
+        header["timestep"] = timestep
+        header["chart"] = chart
+        self.file.write(header.tobytes())
+
+        self.buffer = np.zeros(buffer_size, dtype=RECORD_DTYPE)
+        # Field views, so writing a record does not create any objects
+        self.times = self.buffer["time"]
+        self.step_times = self.buffer["step_time"]
+        self.values = self.buffer["value"]
+        self.kinds = self.buffer["kind"]
+        self.judgments = self.buffer["judgment"]
+        self.count = 0 # Records in the buffer
+
+    def write(self, kind, time, step_time, value=0, judgment=0):
+        """Append one record, flushing the buffer to the file when it is full."""
+        i = self.count
+        self.times[i] = time
+        self.step_times[i] = step_time
+        self.values[i] = value
+        self.kinds[i] = kind
+        self.judgments[i] = judgment
+        self.count = i + 1
+        if self.count == len(self.buffer):
+            self.flush()
+
+    def key(self, down, key, time, step_time):
+        """Record a key press or release."""
+        self.write(KEY_DOWN if down else KEY_UP, time, step_time, key)
+
+    def judgment(self, name, points, step_time):
+        """Record a judgment and the points it scored."""
+        self.write(JUDGMENT, step_time, step_time, points, _JUDGMENT_CODES[name])
+
+    def flush(self):
+        """Write the buffered records to the file."""
+        if self.count:
+            self.file.write(self.buffer[:self.count].data)
+            self.file.flush()
+            self.count = 0
+
+    def close(self, step_time):
+        """Record the end of the session, and close the file if it was opened from a path."""
+        self.write(END, step_time, step_time)
+        self.flush()
+        if self.owns_file:
+            self.file.close()
+
+def read_header(data):
+    """Read and validate the header at the start of a replay's bytes."""
+    if len(data) < HEADER_DTYPE.itemsize:
+        raise ValueError("not a replay file")
+    header = np.frombuffer(data, dtype=HEADER_DTYPE, count=1)[0]
+    if header["magic"] != MAGIC:
+        raise ValueError("not a replay file")
+    if header["version"] != VERSION:
+        raise ValueError(f"unsupported replay version {header['version']}")
+    return header
+
+def read_replay(file):
+    """
+    Read a replay from a path or bytes.
+
+    Returns:
+        (header, records): The header and an array of RECORD_DTYPE records.
+        A trailing partial record (from a crash mid-write) is ignored.
+    """
+    data = file if isinstance(file, bytes) else np.memmap(file, dtype=np.uint8, mode="r")
+    try:
+        header = read_header(data)
+    except ValueError as e:
+        raise ValueError(f"{file if isinstance(file, str) else 'replay'}: {e}") from None
+    count = (len(data) - HEADER_DTYPE.itemsize) // RECORD_DTYPE.itemsize
+    records = np.frombuffer(data, dtype=RECORD_DTYPE, count=count, offset=HEADER_DTYPE.itemsize)
+    return header, records
+
+def judgment_sequence(records):
+    """Return the (step time, judgment, points) of every judgment record, in order."""
+    judged = records[records["kind"] == JUDGMENT]
+    return [(float(t), JUDGMENT_NAMES[j], int(p)) for t, j, p in zip(judged["step_time"], judged["judgment"], judged["value"])]
+
+def run_replay(path, chart_path=None, check_count=None):
+    """
+    Play a replay back headlessly, through the same input handling as the game.
+    With chart_path, the replay is played on that chart instead of the recorded
+    one, which may be an updated version with a different number of notes.
+    check_count makes a chart whose note count differs from the recording an
+    error; by default it is checked only when playing the recorded chart.
+
+    Returns:
+        A dict with the chart played, the replayed score, judgment counts and judgment sequence,
+        the recorded judgment sequence, and whether the two match.
+    """
+    from src.game import GameManager # The game records replays, so import it lazily
+
+    header, records = read_replay(path)
+    game = GameManager(chart_path or header["chart"].decode(), headless=True)
+    if check_count is None:
+        check_count = chart_path is None
+    if check_count and len(game.chart) != header["count"]:
+        raise ValueError(f"{path} was recorded on a chart with {header['count']} notes, not {len(game.chart)}")
+    timestep = float(header["timestep"])
+    replayed = io.BytesIO()
+    game.start_song()
+    game.replay = ReplayWriter(replayed, game.chart_path, len(game.chart), timestep)
+
+    finished = False
+    for kind, time, step_time, value in zip(records["kind"], records["time"], records["step_time"], records["value"]):
+        if kind == JUDGMENT: # Judgments are what the replay produces, not input
+            continue
+        # Step the simulation exactly as the session did up to the moment the event was handled
+        while game.elapsed_time < step_time:
+            game.update(timestep)
+        if kind == SEEK:
+            game.seek(float(time))
+        elif kind == END:
+            finished = True
+            break
+        else:
+            event_type = pygame.KEYDOWN if kind == KEY_DOWN else pygame.KEYUP
+            game.handle_event(pygame.event.Event(event_type, key=int(value)), float(time))
+
+    if not finished: # The session was cut short, so play the rest of the song without input
+        while not game.is_song_finished():
+            game.update(timestep)
+    game.replay.close(game.elapsed_time)
+    pygame.mixer.music.stop()
+
+    recorded = judgment_sequence(records)
+    sequence = judgment_sequence(read_replay(replayed.getvalue())[1])
+    return {
+        "chart": game.chart_path,
+        "score": game.score,
+        "judgments": dict(game.judgment_counts),
+        "sequence": sequence,
+        "recorded": recorded,
+        "matches": sequence == recorded if finished else sequence[:len(recorded)] == recorded,
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay a recorded session headlessly and check it reproduces.")
+    parser.add_argument("replays", nargs="+", help="replay files (.nrr) to play back")
+    parser.add_argument("--chart", help="chart to play instead of the recorded one, e.g. an updated version of it")
+    args = parser.parse_args()
+
+    mismatched = False
+    for path in args.replays:
+        try:
+            result = run_replay(path, args.chart)
+        except ValueError as e:
+            print(e)
+            mismatched = True
+            continue
+        recorded_score = sum(points for _, _, points in result["recorded"])
+        print(f"{path}: score {result['score']} (recorded {recorded_score}), "
+              + ", ".join(f"{judgment} {count}" for judgment, count in sorted(result["judgments"].items())))
+        if not result["matches"]:
+            mismatched = True
+            first = next((i for i, (a, b) in enumerate(zip(result["sequence"], result["recorded"])) if a != b),
+                         min(len(result["sequence"]), len(result["recorded"])))
+            print(f"  judgments differ from the recording from judgment {first + 1} on")
+    if mismatched:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
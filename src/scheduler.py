@@ -0,0 +1,48 @@
+# -------------------------------------------------------------------
+# scheduler.py
+#
+# Releases scheduled notes as the song plays.
+# The schedule is sorted by spawn time once, then a cursor walks
+# forward through it, so each frame only pays for the notes it spawns.
+# Schedules can come from a list of notes or straight from a compiled
+# chart, in which case note objects are only created when released.
+# -------------------------------------------------------------------
+import math
+
+class NoteScheduler:
+    def __init__(self, schedule):
+        """Sort a list of (spawn_time, note) tuples by spawn time."""
+        ordered = sorted(schedule, key=lambda entry: entry[0])
+        for t, n in ordered:
+            n.spawn_time = t
+        notes = [n for _, n in ordered]
+        self.spawn_times = [t for t, _ in ordered]
+        self.make_note = notes.__getitem__
+        self.cursor = 0
+
+    @classmethod
+    def from_chart(cls, chart):
+        """Schedule the notes of a Chart, whose records are already sorted by spawn time."""
+        scheduler = cls.__new__(cls)
+        scheduler.spawn_times = chart.spawn_times
+        scheduler.make_note = chart.make_note
+        scheduler.cursor = 0
+        return scheduler
+
+    def __len__(self):
+        """Return the number of notes still waiting to spawn."""
+        return len(self.spawn_times) - self.cursor
+
+    def peek(self):
+        """Return the spawn time of the next note, or infinity if none are left."""
+        if self.cursor < len(self.spawn_times):
+            return self.spawn_times[self.cursor]
+        return math.inf
+
+    def release(self, now):
+        """Return every note whose spawn time is at or before `now`."""
+        released = []
+        while self.cursor < len(self.spawn_times) and self.spawn_times[self.cursor] <= now:
+            released.append(self.make_note(self.cursor))
+            self.cursor += 1
+        return released
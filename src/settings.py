@@ -0,0 +1,27 @@
+# -------------------------------------------------------------
+# settings.py
+#
+# Player settings saved between sessions as a small JSON file.
+# Missing or unreadable files fall back to the defaults.
+# -------------------------------------------------------------
+import json
+from src.constants import *
+
+DEFAULT_SETTINGS = {
+    "audio_offset": 0.0, # Seconds the player hears the song late, from calibration
+}
+
+def load_settings(path=SETTINGS_FILE):
+    """Return the saved settings merged over the defaults."""
+    settings = dict(DEFAULT_SETTINGS)
+    try:
+        with open(path) as f:
+            settings.update(json.load(f))
+    except (OSError, ValueError):
+        pass
+    return settings
+
+def save_settings(settings, path=SETTINGS_FILE):
+    """Write the settings to disk."""
+    with open(path, "w") as f:
+        json.dump(settings, f, indent=2)
@@ -8,8 +8,11 @@
 import pygame
 import sys
 from src.constants import *
-from src.matrices import create_model_matrix, create_view_matrix, create_perspective_matrix, convert_to_screen, world_to_screen
+from src.matrices import create_model_matrix, create_view_matrix, create_perspective_matrix, convert_to_screen, get_camera_version
 import numpy as np
+from src.text import TEXT_CACHE
+from src.profiler import counters
+from src.projection_lut import get_lut
 
 def define_line_positions():
     """
@@ -41,65 +44,57 @@ def draw_lines(screen):
     """
     start_world_coords, end_world_coords = define_line_positions()
 
-    for start, end in zip(start_world_coords, end_world_coords):
-        # Convert to screen space
-        start_screen = world_to_screen(start)
-        end_screen = world_to_screen(end)
+    # Look up every endpoint's screen position in one pass
+    screen_coords = get_lut().project(np.array(start_world_coords + end_world_coords))
+    start_screen = screen_coords[:NUM_LINES]
+    end_screen = screen_coords[NUM_LINES:]
 
+    for start, end in zip(start_screen, end_screen):
         # Draw line on screen
-        pygame.draw.line(screen, (255, 255, 255), start_screen, end_screen)
-
-# Quad class with moving vertices to visually represent notes
-class Quad:
-    def __init__ (self, column, length = 1.5):
-        self.column = column
-        self.color = (0, 0, 0)
-
-        vertices_3D = np.array([
-            np.array([5, 0, START_Z]), 
-            np.array([5 - LINE_SPACING, 0, START_Z]),
-            np.array([5 - LINE_SPACING, 0, START_Z - length]),
-            np.array([5, 0, START_Z - length])
-        ])
-
-        x_offset = (column - (NUM_LINES + 3) / 2) * LINE_SPACING
-        self.vertices_3D = vertices_3D.copy()
-        self.vertices_3D[:, 0] += x_offset  # Shift x-coordinates
-
-        color_map = {
-            1: (235, 103, 2),
-            2: (2, 235, 231),
-            3: (235, 2, 126),
-            4: (56, 2, 235),
-            5: (45, 235, 2),
-        }
-        self.color = color_map.get(column, (235, 216, 2))
-
-    def get_testing_z(self):
-        """Return the Z-depth of the bottom face of the quad."""
-        return self.vertices_3D[2][2]
+        pygame.draw.line(screen, (255, 255, 255), start, end)
+
+# Note colors shared by every column
+COLUMN_COLORS = {
+    1: (235, 103, 2),
+    2: (2, 235, 231),
+    3: (235, 2, 126),
+    4: (56, 2, 235),
+    5: (45, 235, 2),
+}
+DEFAULT_COLUMN_COLOR = (235, 216, 2)
+
+def column_x_edges(column):
+    """
+    Return the (left, right) world x-coordinates of a column's edges.
+    Works on a single column number or an array of them.
+    """
+    x_offset = (column - (NUM_LINES + 3) / 2) * LINE_SPACING
+    return 5 + x_offset, 5 - LINE_SPACING + x_offset
 
 def draw_judgment(screen):
     """
     Draw the red horizontal judgment zone where notes should be hit.
+    Returns the screen areas that were drawn.
     """
     start_front_3D = np.array([-20, 0, JUDGMENT + 1.5])
     end_front_3D = np.array([20, 0, JUDGMENT + 1.5])
     start_back_3D = np.array([-20, 0, JUDGMENT])
     end_back_3D = np.array([20, 0, JUDGMENT])
 
-    start_front_2D = world_to_screen(start_front_3D)
-    end_front_2D = world_to_screen(end_front_3D)
-    start_back_2D = world_to_screen(start_back_3D)
-    end_back_2D = world_to_screen(end_back_3D)
+    start_front_2D, end_front_2D, start_back_2D, end_back_2D = get_lut().project(
+        np.array([start_front_3D, end_front_3D, start_back_3D, end_back_3D])
+    )
 
 
-    pygame.draw.line(screen, (255, 0, 0), start_front_2D, end_front_2D)
-    pygame.draw.line(screen, (255, 0, 0), start_back_2D, end_back_2D)
+    return [
+        pygame.draw.line(screen, (255, 0, 0), start_front_2D, end_front_2D),
+        pygame.draw.line(screen, (255, 0, 0), start_back_2D, end_back_2D),
+    ]
 
 def draw_column_labels(screen, font):
     """
     Draw labeled key boxes (S, D, F, J, K, L) at the bottom of the screen.
+    Returns the screen areas that were drawn.
     """
     # Map to map column numbers to keyboard keys
     column_to_key = {
@@ -122,7 +117,8 @@ def draw_column_labels(screen, font):
     
     # Calculate starting x position to center the group
     start_x = (SCREEN_WIDTH - total_width) // 2
-    
+
+    rects = []
     for i, (column, key) in enumerate(column_to_key.items()):
         # Calculate x position with fixed spacing
         x_position = start_x + i * spacing
@@ -137,12 +133,62 @@ def draw_column_labels(screen, font):
         text_surface = font.render(key, True, (0, 0, 0))
         text_rect = text_surface.get_rect(center=rect.center)
         screen.blit(text_surface, text_rect)
+        rects.append(rect)
 
-def draw_title_screen(screen):
-    """Render the title screen with instructions and start prompt."""
-    title_font = pygame.font.SysFont(None, 64)
-    subtitle_font = pygame.font.SysFont(None, 28)
+    return rects
 
+class StaticLayer:
+    """
+    Pre-rendered static playfield: the lanes, judgment bars and key boxes.
+    The layers are drawn once and only rebuilt when the screen size or
+    the camera changes.
+    """
+    def __init__(self, font):
+        self.font = font
+        self.key = None
+        self.background = None # Black fill with lane lines
+        self.overlay = None # Judgment bars and key boxes on a transparent surface
+        self.judgment_rects = []
+        self.label_rects = []
+
+    def refresh(self, screen):
+        """Rebuild the layers if the screen size or camera changed since the last build."""
+        key = (screen.get_size(), get_camera_version())
+        if key == self.key:
+            return
+        self.key = key
+
+        self.background = pygame.Surface(screen.get_size())
+        self.background.fill((0, 0, 0))
+        draw_lines(self.background)
+
+        self.overlay = pygame.Surface(screen.get_size(), pygame.SRCALPHA)
+        counters.surfaces += 2
+        self.judgment_rects = draw_judgment(self.overlay)
+        self.label_rects = draw_column_labels(self.overlay, self.font)
+
+    def draw_background(self, screen, rects=None):
+        """Blit the background over the whole screen, or only over the given areas."""
+        self.refresh(screen)
+        if rects is None:
+            screen.blit(self.background, (0, 0))
+        else:
+            screen.blits([(self.background, rect, rect) for rect in rects], doreturn=False)
+
+    def draw_judgment(self, screen):
+        """Blit the judgment bars and return their screen areas."""
+        self.refresh(screen)
+        screen.blits([(self.overlay, rect, rect) for rect in self.judgment_rects], doreturn=False)
+        return self.judgment_rects
+
+    def draw_column_labels(self, screen):
+        """Blit the key boxes and return their screen areas."""
+        self.refresh(screen)
+        screen.blits([(self.overlay, rect, rect) for rect in self.label_rects], doreturn=False)
+        return self.label_rects
+
+def draw_title_screen(screen, loading=False):
+    """Render the title screen with instructions and start prompt (a loading notice while loading)."""
     # Draw black background
     screen.fill((0, 0, 0))
         
@@ -151,7 +197,7 @@ def draw_title_screen(screen):
     title_y = center_y - 150  # Move title up from center
         
     # Draw title
-    title_surface = title_font.render("NOTE RUSH", True, (255, 255, 255))
+    title_surface = TEXT_CACHE.render("NOTE RUSH", (255, 255, 255), 64)
     title_rect = title_surface.get_rect(centerx=SCREEN_WIDTH//2, 
                                            centery=title_y)
     screen.blit(title_surface, title_rect)
@@ -163,18 +209,18 @@ def draw_title_screen(screen):
         "2.Hold keys for long notes",
         "3. Score points for accurate timing",
         "",
-        "PRESS ANY KEY TO START"
+        "LOADING..." if loading else "PRESS ANY KEY TO START"
     ]
         
     # Start instructions below the title with appropriate spacing
     y_offset = title_y + 70
     for line in instructions:
-        if line == "PRESS ANY KEY TO START":
+        if line in ("PRESS ANY KEY TO START", "LOADING..."):
             # Add some space before the start prompt
             y_offset += 30
-            text_surface = subtitle_font.render(line, True, (255, 0, 0))
+            text_surface = TEXT_CACHE.render(line, (255, 0, 0), 28)
         else:
-            text_surface = subtitle_font.render(line, True, (255, 255, 255))
+            text_surface = TEXT_CACHE.render(line, (255, 255, 255), 28)
             
         text_rect = text_surface.get_rect(centerx=SCREEN_WIDTH//2, 
                                              top=y_offset)
@@ -0,0 +1,116 @@
+# -------------------------------------------------------------
+# simulation.py
+#
+# Headless, deterministic playthroughs of a chart.
+# Runs GameManager with the dummy video/audio drivers, a fixed
+# timestep and scripted key presses, as fast as the CPU allows,
+# then reports the score, judgments and simulated frames per second.
+#
+# Input scripts are text files with one event per line:
+#     <time> down|up <key>
+# where time is in song seconds and key is one of S, D, F, J, K, L.
+# Without a script, an autoplay script that presses every note on time
+# is generated from the chart. With --start, play begins part way into
+# the song as in practice mode, and earlier input events are skipped.
+# -------------------------------------------------------------
+import argparse
+import pygame
+from src.constants import *
+from src.note_field import LONG
+from src.game import GameManager
+from src.practice import PracticeSession
+
+KEY_CODES = {pygame.key.name(key).upper(): key for key in COLUMN_KEYS}
+COLUMN_TO_KEY = {column: key for key, column in COLUMN_KEYS.items()}
+
+class ScriptedInput:
+    def __init__(self, events):
+        """Replay a list of (time, event type, key) tuples in time order."""
+        self.events = sorted(events, key=lambda event: event[0])
+        self.cursor = 0
+
+    @classmethod
+    def from_file(cls, path):
+        """Load an input script file (see the module header for the format)."""
+        events = []
+        with open(path) as f:
+            for line_number, line in enumerate(f, 1):
+                line = line.split("#", 1)[0].strip()
+                if not line:
+                    continue
+                try:
+                    t, action, key = line.split()
+                    event_type = {"down": pygame.KEYDOWN, "up": pygame.KEYUP}[action]
+                    events.append((float(t), event_type, KEY_CODES[key.upper()]))
+                except (KeyError, ValueError):
+                    raise ValueError(f"{path}:{line_number}: bad input event {line!r}") from None
+        return cls(events)
+
+    def due(self, now):
+        """
+        Return the pygame events that happened at or before song time `now`,
+        each stamped with its song time in a `time` attribute.
+        """
+        events = []
+        while self.cursor < len(self.events) and self.events[self.cursor][0] <= now:
+            t, event_type, key = self.events[self.cursor]
+            events.append(pygame.event.Event(event_type, key=key, time=t))
+            self.cursor += 1
+        return events
+
+    def seek(self, t):
+        """Skip the events before song time t."""
+        while self.cursor < len(self.events) and self.events[self.cursor][0] < t:
+            self.cursor += 1
+
+def autoplay_script(chart, tap_length=0.05):
+    """Build an input script that presses every note of a chart exactly on time."""
+    events = []
+    for i in range(len(chart)):
+        note = chart.make_note(i) # Same arrival times the game judges against
+        key = COLUMN_TO_KEY[note.column]
+        events.append((note.head_time, pygame.KEYDOWN, key))
+        if note.kind == LONG:
+            events.append((note.tail_time, pygame.KEYUP, key))
+        else:
+            events.append((note.head_time + tap_length, pygame.KEYUP, key))
+    return ScriptedInput(events)
+
+def main():
+    parser = argparse.ArgumentParser(description="Play a chart headlessly and report the result.")
+    parser.add_argument("chart", nargs="?", default=DEFAULT_CHART, help="chart file to play (.chart or .nrc)")
+    parser.add_argument("--script", help="input script to play (defaults to autoplay)")
+    parser.add_argument("--start", type=float, default=0.0, help="song time to start playing from")
+    parser.add_argument("--timestep", type=float, default=SIM_DT, help="simulated seconds per step")
+    parser.add_argument("--render", action="store_true", help="also draw every frame to the dummy display")
+    parser.add_argument("--record", help="also record the run as a replay file")
+    parser.add_argument("--trace", help="write a Chrome trace of the last frames to this file")
+    args = parser.parse_args()
+
+    practice = PracticeSession(args.start) if args.start else None
+    game = GameManager(args.chart, headless=True, practice=practice, replay_path=args.record)
+    input_source = ScriptedInput.from_file(args.script) if args.script else autoplay_script(game.chart)
+    input_source.seek(args.start)
+    result = game.simulate(input_source, args.timestep, render=args.render)
+
+    print(f"Score: {result['score']}")
+    for judgment, count in sorted(result["judgments"].items()):
+        print(f"  {judgment}: {count}")
+    if args.trace:
+        game.profiler.export_trace(args.trace)
+
+    print(game.startup_report())
+    print(game.sound.report())
+    print(f"{result['frames']} frames ({result['song_time']:.2f}s of song) in {result['wall_time']:.3f}s "
+          f"= {result['fps']:.0f} simulated fps")
+
+    print(f"{'phase':<12}{'p50 ms':>10}{'p99 ms':>10}")
+    for phase, value in result["profile"].items():
+        if isinstance(value, tuple):
+            print(f"{phase:<12}{value[0]:>10.3f}{value[1]:>10.3f}")
+    counts = {name: value for name, value in result["profile"].items() if not isinstance(value, tuple)}
+    if counts:
+        print("mean per frame: " + ", ".join(f"{name} {value:.1f}" for name, value in counts.items()))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,69 @@
+# -------------------------------------------------------------
+# song_clock.py
+#
+# Song clock driven by the audio playback position.
+# Between position updates (which only change once per mixer
+# buffer) the clock runs on time.perf_counter(), so it stays smooth.
+# Each new position is compared with the running estimate: small
+# errors are corrected gradually, large ones (a stall or a seek)
+# snap the clock straight to the audio.
+#
+# Song time is what the player hears: the playback position minus the
+# mixer's output latency and the player's calibrated audio offset.
+# Practice mode can start the clock part way into the song and run it
+# faster or slower than real time (see practice.py).
+# -------------------------------------------------------------
+import time
+import pygame
+from src.constants import *
+
+def music_position():
+    """Return the playback position of pygame.mixer.music in seconds, or None if it is not playing."""
+    position = pygame.mixer.music.get_pos()
+    return position / 1000 if position >= 0 else None
+
+class SongClock:
+    def __init__(self, get_position=music_position, latency=0.0, offset=0.0,
+                 smoothing=CLOCK_SMOOTHING, max_drift=MAX_CLOCK_DRIFT, rate=1.0):
+        """
+        get_position returns the playback position in seconds, or None when nothing is playing.
+        latency is the mixer's output latency and offset the player's calibrated audio offset,
+        both in seconds. smoothing is the fraction of the error corrected per position update,
+        and errors larger than max_drift are corrected at once.
+        rate is how many song seconds pass per real second.
+        """
+        self.get_position = get_position
+        self.latency = latency
+        self.offset = offset
+        self.smoothing = smoothing
+        self.max_drift = max_drift
+        self.rate = rate
+        self.origin = time.perf_counter() # perf_counter() value at song time 0
+        self.start_position = 0.0 # Song position the playback was started from
+        self.last_position = None
+        self.drift = 0.0 # Error found at the last position update
+
+    def start(self, at=0.0):
+        """Start counting from song time `at`, for a song that started playing from there just now."""
+        self.origin = time.perf_counter() + self.latency + self.offset - at / self.rate
+        self.start_position = at
+        self.last_position = None
+        self.drift = 0.0
+
+    def time(self):
+        """Return the current song time estimate."""
+        return (time.perf_counter() - self.origin) * self.rate
+
+    def sync(self):
+        """Correct the estimate with the playback position, if it has changed since the last call."""
+        position = self.get_position()
+        if position is None or position == self.last_position:
+            return
+        self.last_position = position
+
+        # The playback position counts from where playback started
+        self.drift = self.start_position + position - self.latency - self.offset - self.time() # Positive when the audio is ahead
+        if abs(self.drift) > self.max_drift:
+            self.origin -= self.drift / self.rate
+        else:
+            self.origin -= self.drift * self.smoothing / self.rate
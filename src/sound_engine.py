@@ -0,0 +1,89 @@
+# -------------------------------------------------------------
+# sound_engine.py
+#
+# Low-latency playback of hit sounds.
+# The mixer is opened with a configurable frequency and buffer size
+# (smaller buffers mean less delay before a sound is heard). Each
+# column gets its own reserved mixer channels, so fast runs in one
+# column cannot starve another and automatic channel picking never
+# takes them. When all of a column's voices are busy, the one that
+# started longest ago is stolen. The song streams through
+# pygame.mixer.music, which never shares these channels.
+#
+# Trigger-to-output latency is measured for every hit sound as the time
+# from polling the key press to starting the channel, plus one mixer
+# buffer of output delay.
+# -------------------------------------------------------------
+import time
+import pygame
+from src.constants import *
+
+def init_mixer(frequency=AUDIO_FREQUENCY, buffer_size=AUDIO_BUFFER_SIZE):
+    """Set the mixer's frequency and buffer size; call before pygame.init()."""
+    pygame.mixer.pre_init(frequency, -16, 2, buffer_size)
+
+class SoundEngine:
+    def __init__(self, buffer_size=AUDIO_BUFFER_SIZE, voices_per_column=VOICES_PER_COLUMN,
+                 shared_channels=SHARED_CHANNELS, latency_samples=1024):
+        """
+        Reserve voices_per_column channels for every column, plus shared_channels
+        for sounds that do not belong to a column. The mixer must be initialized.
+        """
+        columns = sorted(COLUMN_KEYS.values())
+        reserved = voices_per_column * len(columns)
+        pygame.mixer.set_num_channels(reserved + shared_channels)
+        pygame.mixer.set_reserved(reserved)
+
+        self.voices = {
+            column: [pygame.mixer.Channel(i * voices_per_column + v) for v in range(voices_per_column)]
+            for i, column in enumerate(columns)
+        }
+        self.started = {} # Reserved voice -> perf_counter() value when its sound started
+        self.output_latency = buffer_size / pygame.mixer.get_init()[0]
+        self.stolen = 0 # Voices cut off to play a newer sound
+
+        # Ring buffer of measured latencies in seconds
+        self.latencies = np.zeros(latency_samples)
+        self.latency_count = 0
+
+    def voice(self, column):
+        """Return an idle channel of the column, or steal the one that started longest ago."""
+        voices = self.voices[column]
+        for channel in voices:
+            if not channel.get_busy():
+                return channel
+        self.stolen += 1
+        return min(voices, key=lambda channel: self.started.get(channel, 0))
+
+    def play(self, sound, column=None, triggered_at=None):
+        """
+        Play a sound on one of the column's voices, or on a shared channel when column is None.
+        triggered_at is the perf_counter() value of the input that caused it, for the latency stats.
+        """
+        if column in self.voices:
+            channel = self.voice(column)
+            channel.play(sound)
+            now = time.perf_counter()
+            self.started[channel] = now
+        else:
+            sound.play() # Shared channels; reserved ones are never picked
+            now = time.perf_counter()
+
+        if triggered_at is not None:
+            self.latencies[self.latency_count % len(self.latencies)] = now - triggered_at + self.output_latency
+            self.latency_count += 1
+
+    def latency_summary(self):
+        """Return the p50 and p99 trigger-to-output latency in milliseconds, or None if nothing played."""
+        count = min(self.latency_count, len(self.latencies))
+        if count == 0:
+            return None
+        return tuple(np.percentile(self.latencies[:count], (50, 99)) * 1000)
+
+    def report(self):
+        """Return a one-line summary of the measured latency."""
+        summary = self.latency_summary()
+        if summary is None:
+            return "Hit sounds: none played"
+        return (f"Hit sounds: {summary[0]:.1f} ms p50, {summary[1]:.1f} ms p99 trigger-to-output latency "
+                f"({self.output_latency * 1000:.1f} ms mixer buffer, {self.stolen} voices stolen)")
@@ -0,0 +1,120 @@
+# -------------------------------------------------------------
+# sprites.py
+#
+# Sprite cache for note rendering.
+# A short note's on-screen shape depends only on its column and depth,
+# so each (column, depth bucket) is rasterized once onto a small
+# surface and then blitted wherever a note of that column is at that
+# depth. Depth buckets are SPRITE_Y_STEP pixels of the note head's
+# screen y, which keeps shapes within a pixel of the exact quad.
+# The cache is bounded by the bytes of its surfaces and evicts the
+# least recently used sprites; it is emptied when the camera changes.
+# Sprites used by the frame being drawn are never evicted for it: the
+# most shared sprites are looked up first, and once they fill the budget
+# the frame's other short notes have no sprite and are drawn as polygons
+# instead of churning the cache.
+#
+# Long notes stretch to any length, so they are still drawn as polygons.
+# -------------------------------------------------------------
+import pygame
+from collections import OrderedDict
+from src.constants import *
+from src.shapes import COLUMN_COLORS, DEFAULT_COLUMN_COLOR
+from src.projection_lut import get_lut, column_edge_indices
+from src.profiler import counters
+
+class SpriteCache:
+    def __init__(self, max_bytes=SPRITE_CACHE_BYTES, y_step=SPRITE_Y_STEP):
+        self.max_bytes = max_bytes
+        self.y_step = y_step
+        self.sprites = OrderedDict() # (column, bucket) -> surface, oldest first
+        self.bytes = 0
+        self.lut = None # Table the sprites were rasterized with
+        self.in_use = set() # Keys used by the current blits call
+        self.full = False # Set once the current call's sprites fill the budget
+        self.hits = 0
+        self.misses = 0
+
+    def clear(self):
+        """Drop every sprite."""
+        self.sprites.clear()
+        self.bytes = 0
+
+    def sprite(self, column, bucket):
+        """
+        Return the sprite of a short note in `column` whose head is at screen y bucket * y_step,
+        or None if it would not fit without evicting a sprite the current frame uses.
+        """
+        key = (column, bucket)
+        surface = self.sprites.get(key)
+        if surface is not None:
+            self.sprites.move_to_end(key)
+            self.in_use.add(key)
+            self.hits += 1
+            return surface
+
+        self.misses += 1
+        if self.full:
+            return None
+        surface = self.render(column, bucket * self.y_step)
+        size = surface.get_width() * surface.get_height() * 4
+        # Evict the least recently used sprites, but none this frame has drawn
+        while self.bytes + size > self.max_bytes and self.sprites:
+            old_key = next(iter(self.sprites))
+            if old_key in self.in_use:
+                self.full = True
+                return None
+            old = self.sprites.pop(old_key)
+            self.bytes -= old.get_width() * old.get_height() * 4
+        self.sprites[key] = surface
+        self.bytes += size
+        self.in_use.add(key)
+        return surface
+
+    def render(self, column, head_y):
+        """Rasterize a short note in `column` whose head is at screen y head_y."""
+        lut = self.lut
+        head_z = np.interp(head_y, lut.screen_y[::-1], lut.z[::-1]) # screen y falls as depth grows
+        left, right = column_edge_indices(np.array([column]))
+        quad = lut.project_quads(left, right, np.array([head_z + SHORT_NOTE_LENGTH]), np.array([head_z]))[0]
+
+        left, top = np.floor(quad.min(axis=0))
+        right, bottom = np.ceil(quad.max(axis=0)) + 1
+        surface = pygame.Surface((int(right - left), int(bottom - top)))
+        surface.fill(SPRITE_COLORKEY)
+        surface.set_colorkey(SPRITE_COLORKEY, pygame.RLEACCEL) # Colorkeyed blits are faster than per-pixel alpha
+        counters.surfaces += 1
+        quad -= (left, top)
+        pygame.draw.polygon(surface, COLUMN_COLORS.get(column, DEFAULT_COLUMN_COLOR), quad)
+        pygame.draw.lines(surface, (255, 255, 255), True, quad, 1)
+        return surface
+
+    def blits(self, columns, quads):
+        """
+        Return (surface, position) pairs that draw short notes of the given columns
+        over their projected (N, 4, 2) quads, ready for one screen.blits call, and
+        a mask of the notes that got no sprite because the budget is full.
+        """
+        lut = get_lut()
+        if lut is not self.lut: # New camera, so every sprite is stale
+            self.clear()
+            self.lut = lut
+
+        buckets = np.rint(quads[:, 2, 1] / self.y_step).astype(int) # Head edge screen y
+        corners = np.floor(quads.min(axis=1)).astype(int).tolist()
+
+        # Look each distinct sprite up once, however many notes share it
+        # One integer per (column, bucket); columns are below 8, so they fit in the low bits
+        codes, inverse, counts = np.unique(buckets * 8 + columns, return_inverse=True, return_counts=True)
+        keys = np.column_stack([codes % 8, codes // 8])
+        self.in_use.clear()
+        self.full = False
+        # The most shared sprites come first, so a full budget leaves the fewest notes as polygons
+        surfaces = [None] * len(keys)
+        for k in np.argsort(-counts, kind="stable").tolist():
+            column, bucket = keys[k].tolist()
+            surfaces[k] = self.sprite(column, bucket)
+        inverse = inverse.ravel().tolist()
+        pairs = [(surfaces[k], corner) for k, corner in zip(inverse, corners) if surfaces[k] is not None]
+        missing = np.array([surfaces[k] is None for k in inverse], dtype=bool)
+        return pairs, missing
@@ -0,0 +1,61 @@
+# -------------------------------------------------------------
+# text.py
+#
+# Font registry and text surface cache.
+# Fonts are looked up once per (name, size). Rendered text is cached
+# by (font, text, color) with least-recently-used eviction, and
+# numbers are composed from cached digit glyphs so a changing score
+# never re-renders the whole string.
+# -------------------------------------------------------------
+import pygame
+from collections import OrderedDict
+from src.profiler import counters
+
+_fonts = {}
+
+def get_font(size, name=None):
+    """Return the SysFont for (name, size), creating it on first use."""
+    key = (name, size)
+    if key not in _fonts:
+        _fonts[key] = pygame.font.SysFont(name, size)
+    return _fonts[key]
+
+class TextCache:
+    def __init__(self, max_entries=256):
+        self.max_entries = max_entries
+        self.surfaces = OrderedDict() # (font key, text, color) -> surface, oldest first
+
+    def render(self, text, color, size, name=None):
+        """Return a rendered text surface, reusing a cached one when possible."""
+        key = ((name, size), text, color)
+        surface = self.surfaces.get(key)
+        if surface is not None:
+            self.surfaces.move_to_end(key)
+            return surface
+
+        surface = get_font(size, name).render(text, True, color)
+        counters.surfaces += 1
+        self.surfaces[key] = surface
+        if len(self.surfaces) > self.max_entries: # Evict the least recently used surface
+            self.surfaces.popitem(last=False)
+        return surface
+
+    def draw_number(self, screen, prefix, number, position, color, size, name=None):
+        """
+        Draw a label followed by a number, composing the digits from cached glyphs.
+        Returns the screen area drawn.
+        """
+        font = get_font(size, name)
+        x, y = position
+        rect = screen.blit(self.render(prefix, color, size, name), (x, y))
+        x += font.size(prefix)[0]
+
+        for digit in str(number):
+            glyph = self.render(digit, color, size, name)
+            rect.union_ip(screen.blit(glyph, (x, y)))
+            x += font.metrics(digit)[0][4] # Advance to the next glyph
+
+        return rect
+
+# Shared cache for the HUD, judgment messages and title screen
+TEXT_CACHE = TextCache()